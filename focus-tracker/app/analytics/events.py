@@ -0,0 +1,240 @@
+# app/analytics/events.py
+"""Raw per-tick analysis events, persisted for bulk export.
+
+Every analyzed screenshot of a session is appended as one row to the events
+table (in the same SQLite file as the rollups). Exports read the rows back
+with a cursor in fixed-size batches and stream them out as NDJSON lines or
+Parquet row groups, so memory use stays flat however many months of data
+are exported.
+"""
+import io
+import json
+import sqlite3
+import threading
+import logging
+from datetime import datetime, timezone
+from app.core.settings import settings
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: only needed for Parquet exports
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    goal TEXT,
+    timestamp REAL NOT NULL,
+    status TEXT,
+    alert_level TEXT,
+    confidence REAL,
+    message TEXT,
+    model TEXT,
+    late INTEGER NOT NULL DEFAULT 0,
+    reused INTEGER NOT NULL DEFAULT 0,
+    shed INTEGER NOT NULL DEFAULT 0,
+    alert INTEGER NOT NULL DEFAULT 0,
+    thumbnail TEXT
+);
+CREATE INDEX IF NOT EXISTS events_timestamp ON events (timestamp);
+CREATE INDEX IF NOT EXISTS events_session ON events (session_id, timestamp);
+"""
+
+COLUMNS = ("id", "session_id", "goal", "timestamp", "status", "alert_level", "confidence", "message",
+           "model", "late", "reused", "shed", "alert", "thumbnail")
+BOOLEAN_COLUMNS = ("late", "reused", "shed", "alert")
+
+
+def parse_time(value):
+    """Epoch seconds from an epoch number or an ISO-8601 string (None passes through)"""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        moment = datetime.fromisoformat(str(value))
+        if moment.tzinfo is None:
+            moment = moment.astimezone()  # Naive times are local, like the alert timestamps
+        return moment.timestamp()
+
+
+class EventLog:
+    def __init__(self, path=None):
+        self.path = path or settings.analytics_db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def record(self, session_id, goal, timestamp, result, alert=False, thumbnail=None):
+        """Append one analyzed tick"""
+        row = (session_id, goal, timestamp, result.get("status"), result.get("alert_level"),
+               result.get("confidence"), result.get("message"), result.get("model"),
+               int(bool(result.get("late"))), int(bool(result.get("reused"))),
+               int(bool(result.get("shed"))), int(alert), thumbnail)
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    f"INSERT INTO events ({', '.join(COLUMNS[1:])}) VALUES ({', '.join('?' for _ in COLUMNS[1:])})",
+                    row)
+        except sqlite3.Error as e:
+            logger.error("Error recording analysis event: %s", e)
+
+    def query(self, session_id=None, goal=None, start=None, end=None, levels=None, statuses=None,
+              alerts_only=False, batch_size=EXPORT_BATCH_SIZE):
+        """Yield matching events as dicts, oldest first, reading batch_size rows at a time"""
+        clauses, params = [], []
+        for column, value in (("session_id", session_id), ("goal", goal)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if start is not None:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("timestamp < ?")
+            params.append(end)
+        for column, values in (("alert_level", levels), ("status", statuses)):
+            if values:
+                clauses.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+        if alerts_only:
+            clauses.append("alert = 1")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        # A dedicated connection per export, so long exports never hold the writer's lock
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM events {where} ORDER BY timestamp, id", params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    event = dict(zip(COLUMNS, row))
+                    for column in BOOLEAN_COLUMNS:
+                        event[column] = bool(event[column])
+                    yield event
+        finally:
+            conn.close()
+
+    def sessions(self):
+        """Every recorded session with its goal, time span and event count"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id, goal, MIN(timestamp), MAX(timestamp), COUNT(*) FROM events "
+                "GROUP BY session_id ORDER BY MIN(timestamp)"
+            ).fetchall()
+        return [{"session_id": r[0], "goal": r[1], "start": r[2], "end": r[3], "events": r[4]} for r in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SessionEvents:
+    """Records one session's analysis results in the event log"""
+
+    def __init__(self, log, session_id, goal):
+        self.log = log
+        self.session_id = session_id
+        self.goal = goal
+
+    def record(self, result, timestamp, alert=False, thumbnail=None):
+        self.log.record(self.session_id, self.goal, timestamp, result, alert, thumbnail)
+
+
+def iso_time(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+def iter_ndjson(events, lines_per_chunk=500):
+    """Encode events as NDJSON, yielding a few hundred lines per chunk"""
+    chunk = []
+    for event in events:
+        event["timestamp"] = iso_time(event["timestamp"])
+        chunk.append(json.dumps(event))
+        if len(chunk) >= lines_per_chunk:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back in chunks instead of keeping them"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_schema():
+    return pa.schema([
+        ("id", pa.int64()), ("session_id", pa.string()), ("goal", pa.string()),
+        ("timestamp", pa.timestamp("ms", tz="UTC")), ("status", pa.string()), ("alert_level", pa.string()),
+        ("confidence", pa.float64()), ("message", pa.string()), ("model", pa.string()),
+        ("late", pa.bool_()), ("reused", pa.bool_()), ("shed", pa.bool_()), ("alert", pa.bool_()),
+        ("thumbnail", pa.string()),
+    ])
+
+
+def iter_parquet(events, row_group_size=EXPORT_BATCH_SIZE):
+    """Encode events as a Parquet file, yielding bytes after every row group"""
+    if pa is None:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+    schema = parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    columns = {name: [] for name in schema.names}
+    rows = 0
+    for event in events:
+        for name in schema.names:
+            value = event[name]
+            columns[name].append(int(value * 1000) if name == "timestamp" else value)
+        rows += 1
+        if rows >= row_group_size:
+            writer.write_table(pa.table(columns, schema=schema))
+            columns = {name: [] for name in schema.names}
+            rows = 0
+            yield sink.drain()
+    if rows:
+        writer.write_table(pa.table(columns, schema=schema))
+    writer.close()
+    yield sink.drain()
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_event_log():
+    """The process-wide event log"""
+    global _log
+    with _log_lock:
+        if _log is None:
+            _log = EventLog()
+    return _log
@@ -0,0 +1,67 @@
+# app/analytics/export.py
+"""Bulk export of recorded analysis events from the command line.
+
+    python -m app.analytics.export --format parquet --start 2024-01-01 --output january.parquet
+    python -m app.analytics.export --level CAUTION --level ALERT --alerts-only > distractions.ndjson
+
+Reads the analytics database directly, so it works while the server is
+running or stopped.
+"""
+import argparse
+import logging
+import sys
+from app.analytics.events import EventLog, iter_ndjson, iter_parquet, parse_time, iso_time, pa
+from app.core.logging_config import setup_logging
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export recorded analysis events as NDJSON or Parquet")
+    parser.add_argument("--format", choices=["ndjson", "parquet"], default="ndjson", help="Output format")
+    parser.add_argument("--output", default="-", help="Output file (default: stdout, NDJSON only)")
+    parser.add_argument("--db", default=None, help="Analytics database (default: ANALYTICS_DB_PATH)")
+    parser.add_argument("--session", default=None, help="Only this session id")
+    parser.add_argument("--goal", default=None, help="Only sessions with this goal")
+    parser.add_argument("--start", default=None, help="Earliest event time (epoch seconds or ISO-8601)")
+    parser.add_argument("--end", default=None, help="Latest event time, exclusive")
+    parser.add_argument("--level", action="append", help="Alert level to include (repeatable)")
+    parser.add_argument("--status", action="append", help="Analysis status to include (repeatable)")
+    parser.add_argument("--alerts-only", action="store_true", help="Only events that created an alert")
+    parser.add_argument("--list-sessions", action="store_true", help="List recorded sessions and exit")
+    args = parser.parse_args()
+
+    setup_logging(level=logging.WARNING)
+    log = EventLog(args.db)
+
+    if args.list_sessions:
+        for session in log.sessions():
+            print(f"{session['session_id']}  {iso_time(session['start'])}  {iso_time(session['end'])}  "
+                  f"{session['events']:>7} events  {session['goal']}")
+        return
+
+    try:
+        start, end = parse_time(args.start), parse_time(args.end)
+    except ValueError:
+        parser.error("--start and --end must be epoch seconds or ISO-8601 times")
+    if args.format == "parquet":
+        if pa is None:
+            parser.error("Parquet export requires pyarrow (pip install pyarrow)")
+        if args.output == "-":
+            parser.error("Parquet output needs --output")
+
+    events = log.query(session_id=args.session, goal=args.goal, start=start, end=end,
+                       levels=args.level, statuses=args.status, alerts_only=args.alerts_only)
+    if args.format == "parquet":
+        with open(args.output, "wb") as f:
+            for chunk in iter_parquet(events):
+                f.write(chunk)
+    elif args.output == "-":
+        for chunk in iter_ndjson(events):
+            sys.stdout.write(chunk)
+    else:
+        with open(args.output, "w") as f:
+            for chunk in iter_ndjson(events):
+                f.write(chunk)
+
+
+if __name__ == "__main__":
+    main()
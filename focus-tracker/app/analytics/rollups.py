@@ -0,0 +1,168 @@
+# app/analytics/rollups.py
+"""Cross-session focus analytics kept as incrementally updated rollups.
+
+Every analyzed tick adds its contribution to an hourly and a daily bucket,
+both for its goal and for the all-goals total, so trend queries read a
+handful of pre-aggregated rows instead of rescanning raw events. Buckets are
+aligned to UTC and stored in SQLite.
+"""
+import sqlite3
+import threading
+import logging
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"hour": 3600, "day": 86400}
+TOTAL_GOAL = "*"  # Goal key for the all-goals rollup
+DISTRACTED_LEVELS = ("CAUTION", "ALERT")
+
+COUNTERS = ("screenshots", "focused_seconds", "distracted_screenshots", "distraction_episodes",
+            "refocus_count", "refocus_seconds", "api_calls")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    period TEXT NOT NULL,
+    bucket_start INTEGER NOT NULL,
+    goal TEXT NOT NULL,
+    screenshots INTEGER NOT NULL DEFAULT 0,
+    focused_seconds REAL NOT NULL DEFAULT 0,
+    distracted_screenshots INTEGER NOT NULL DEFAULT 0,
+    distraction_episodes INTEGER NOT NULL DEFAULT 0,
+    refocus_count INTEGER NOT NULL DEFAULT 0,
+    refocus_seconds REAL NOT NULL DEFAULT 0,
+    api_calls INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (period, goal, bucket_start)
+)
+"""
+
+
+def bucket_start(timestamp, period):
+    """Start of the UTC bucket containing the epoch timestamp"""
+    size = PERIODS[period]
+    return int(timestamp // size * size)
+
+
+class RollupStore:
+    """SQLite-backed hourly and daily rollups"""
+
+    def __init__(self, path=None):
+        self.path = path or settings.analytics_db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+
+    def add(self, goal, timestamp, deltas):
+        """Add counter deltas to the hour and day buckets of the goal and the total"""
+        columns = [c for c in COUNTERS if deltas.get(c)]
+        if not columns:
+            return
+        values = [deltas[c] for c in columns]
+        sql = (f"INSERT INTO rollups (period, bucket_start, goal, {', '.join(columns)}) "
+               f"VALUES (?, ?, ?, {', '.join('?' for _ in columns)}) "
+               f"ON CONFLICT (period, goal, bucket_start) DO UPDATE SET "
+               + ", ".join(f"{c} = {c} + excluded.{c}" for c in columns))
+        rows = []
+        for period in PERIODS:
+            start = bucket_start(timestamp, period)
+            for key in {goal or TOTAL_GOAL, TOTAL_GOAL}:
+                rows.append((period, start, key, *values))
+        with self._lock, self._conn:
+            self._conn.executemany(sql, rows)
+
+    def buckets(self, period, start, end, goal=None):
+        """Return the rollup rows of a period between two epoch timestamps, oldest first"""
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period: {period}")
+        with self._lock:
+            cursor = self._conn.execute(
+                f"SELECT bucket_start, {', '.join(COUNTERS)} FROM rollups "
+                "WHERE period = ? AND goal = ? AND bucket_start >= ? AND bucket_start < ? "
+                "ORDER BY bucket_start",
+                (period, goal or TOTAL_GOAL, bucket_start(start, period), end),
+            )
+            rows = cursor.fetchall()
+        return [dict(zip(("bucket_start",) + COUNTERS, row)) for row in rows]
+
+    def goals(self):
+        """Return every goal with recorded analytics"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT goal FROM rollups WHERE period = 'day' AND goal != ?", (TOTAL_GOAL,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def with_derived_metrics(row):
+    """Add the dashboard metrics derived from a rollup row's counters"""
+    row = dict(row)
+    row["focused_minutes"] = row["focused_seconds"] / 60
+    row["focus_percentage"] = ((row["screenshots"] - row["distracted_screenshots"]) / row["screenshots"] * 100
+                               if row["screenshots"] else None)
+    row["mean_time_to_refocus"] = (row["refocus_seconds"] / row["refocus_count"]
+                                   if row["refocus_count"] else None)
+    return row
+
+
+class SessionRollup:
+    """Turns one session's analysis results into rollup deltas.
+
+    Keeps the small amount of state needed to detect distraction episodes
+    and time how long the user takes to refocus.
+    """
+
+    def __init__(self, store, goal, interval):
+        self.store = store
+        self.goal = goal
+        self.interval = interval
+        self.distracted_since = None
+
+    def record(self, result, timestamp):
+        """Record one tick's analysis result (successful or not)"""
+        # Escalated frames cost one call per tier; failed (spooled) frames are counted once backfilled
+        spent = not (result.get("reused") or result.get("local") or result.get("shed"))
+        deltas = {"api_calls": result.get("model_calls", 1) if spent and result.get("status") == "success" else 0}
+
+        if result.get("status") == "success":
+            deltas["screenshots"] = 1
+            if result.get("late"):
+                # Backfilled frames arrive out of order, so they only count towards totals
+                if result.get("alert_level") in DISTRACTED_LEVELS:
+                    deltas["distracted_screenshots"] = 1
+                else:
+                    deltas["focused_seconds"] = self.interval
+            elif result.get("alert_level") in DISTRACTED_LEVELS:
+                deltas["distracted_screenshots"] = 1
+                if self.distracted_since is None:
+                    self.distracted_since = timestamp
+                    deltas["distraction_episodes"] = 1
+            else:
+                deltas["focused_seconds"] = self.interval
+                if self.distracted_since is not None:
+                    deltas["refocus_count"] = 1
+                    deltas["refocus_seconds"] = timestamp - self.distracted_since
+                    self.distracted_since = None
+
+        try:
+            self.store.add(self.goal, timestamp, deltas)
+        except sqlite3.Error as e:
+            logger.error("Error updating analytics rollups: %s", e)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_rollup_store():
+    """Return the shared rollup store, opening it on first use"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RollupStore()
+        return _store
@@ -3,16 +3,27 @@ from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 import time
-from app.mule.tasks import set_user_goal, process_screenshot, get_session_summary as generate_session_summary
+import uuid
+from fastapi.concurrency import run_in_threadpool
+from app.mule.tasks import set_user_goal, process_screenshot, get_model_stats, get_scheduler_stats
 from app.watcher.monitor import Monitor
 import logging
-from app.utils.image_analysis import set_api_key, reset_api_key
+from app.utils.async_client import (set_api_key_async, reset_api_key_async, warm_up_models_async,
+                                    get_session_summary_async)
+from app.utils.timeline import SessionTimeline
+from app.utils.thumbnails import get_thumbnail_store, thumbnail_url
+from app.core.settings import settings
+from app.analytics.rollups import SessionRollup, get_rollup_store
+from app.analytics.events import SessionEvents, get_event_log
 
 # Constants
 ALERT_LEVEL_NORMAL = "NORMAL"
 ALERT_LEVEL_CAUTION = "CAUTION"
 ALERT_LEVEL_ALERT = "ALERT"
 
+# Alert levels that get a thumbnail (empty = all)
+THUMBNAIL_LEVELS = {level.strip() for level in settings.thumbnail_levels.split(",") if level.strip()}
+
 router = APIRouter(prefix="/api", tags=["alerts"])
 
 # Initialize the monitor
@@ -30,6 +41,8 @@ class Alert(BaseModel):
     alert_level: str
     confidence: Optional[float] = None
     screenshot_path: Optional[str] = None
+    thumbnail: Optional[str] = None  # URL of the stored WebP thumbnail (screenshots are rotated out)
+    late: bool = False  # Analyzed after the fact (backfilled after an outage)
 
 class SessionStatus(BaseModel):
     is_active: bool
@@ -37,6 +50,7 @@ class SessionStatus(BaseModel):
     elapsed_time: Optional[float] = None
     goal: Optional[str] = None
     latest_alert: Optional[Alert] = None
+    is_idle: bool = False  # Capture is suspended because the user is away
 
 alerts_db = []
 
@@ -46,8 +60,16 @@ class SessionData:
     def __init__(self):
         self.start_time = None
         self.goal = None
-        self.screenshots = []
-        self.alerts = []
+        # Compact columnar record of every analyzed screenshot
+        self.timeline = SessionTimeline()
+        # Feeds the cross-session analytics rollups (None outside live sessions)
+        self.rollup = None
+        # Raw per-tick events kept for bulk export (None outside live sessions)
+        self.session_id = None
+        self.events = None
+        # Time the user was away, kept apart from the analyzed screenshots
+        self.idle_periods = []
+        self.idle_seconds = 0.0
         self.end_time = None
         
     def reset(self):
@@ -59,7 +81,7 @@ session_data = SessionData()
 @router.post("/goals/", response_model=Goal, status_code=201)
 async def create_goal(goal: Goal, background_tasks: BackgroundTasks):
     """Set a new goal and start the monitoring session"""
-    logger.info(f"Creating new goal: {goal.text}")
+    logger.info("Creating new goal: %s", goal.text)
     
     try:
         # Check if a custom API key was provided
@@ -67,7 +89,7 @@ async def create_goal(goal: Goal, background_tasks: BackgroundTasks):
             logger.info("User provided a custom API key, validating...")
             
             # Try to configure with the custom key
-            key_valid = set_api_key(goal.api_key)
+            key_valid = await set_api_key_async(goal.api_key)
             
             if not key_valid:
                 # Key validation failed
@@ -79,19 +101,26 @@ async def create_goal(goal: Goal, background_tasks: BackgroundTasks):
             
             logger.info("Custom API key validated successfully")
         
-        # Set the user's goal
-        set_user_goal(goal.text)
+        # Open the model connection now so the first frame doesn't pay for it
+        await warm_up_models_async()
         
         # Store session data
         session_data.start_time = datetime.now()
         session_data.goal = goal.text
-        session_data.screenshots = []
-        session_data.alerts = []
+        session_data.timeline = SessionTimeline()
+        session_data.idle_periods = []
+        session_data.idle_seconds = 0.0
+        session_data.rollup = SessionRollup(get_rollup_store(), goal.text, goal.screenshot_interval)
+        session_data.session_id = uuid.uuid4().hex[:16]
+        session_data.events = SessionEvents(get_event_log(), session_data.session_id, goal.text)
+        
+        # Set the user's goal (frames spooled during an outage keep this session's id)
+        set_user_goal(goal.text, session_id=session_data.session_id, interval=goal.screenshot_interval)
         
         # Configure and start the monitor
         monitor.set_interval(goal.screenshot_interval)
         monitor.start()
-        logger.info(f"Started monitoring with interval: {goal.screenshot_interval}s")
+        logger.info("Started monitoring with interval: %ss", goal.screenshot_interval)
         
         # Create a response without the API key
         return Goal(
@@ -103,8 +132,8 @@ async def create_goal(goal: Goal, background_tasks: BackgroundTasks):
         # Re-raise HTTP exceptions
         raise http_ex
     except Exception as e:
-        logger.error(f"Error creating goal: {str(e)}")
-        reset_api_key()  # Ensure we reset to default key on errors
+        logger.error("Error creating goal: %s", e)
+        await reset_api_key_async()  # Ensure we reset to default key on errors
         raise HTTPException(status_code=500, detail=f"Failed to start session: {str(e)}")
 
 # Add an endpoint to check API key status
@@ -115,47 +144,96 @@ async def validate_key(data: dict):
         return {"valid": False, "message": "No API key provided"}
         
     try:
-        key_valid = set_api_key(data["api_key"])
+        key_valid = await set_api_key_async(data["api_key"])
         
         if key_valid:
-            reset_api_key()
+            await reset_api_key_async()
             return {"valid": True, "message": "API key is valid"}
         else:
             return {"valid": False, "message": "Invalid API key"}
     except Exception as e:
-        reset_api_key()
+        await reset_api_key_async()
         return {"valid": False, "message": f"Error validating API key: {str(e)}"}
 
 # Add a function to create alerts from analysis results
-def create_alert_from_analysis(result, screenshot_path):
+def create_alert_from_analysis(result, screenshot_path, timestamp=None):
     """Create an alert from screenshot analysis results"""
+    # Create a timestamp (replays pass the original capture time)
+    timestamp = timestamp or datetime.now()
+    
+    # Every analyzed tick counts towards analytics, including failed model calls
+    if session_data.rollup:
+        session_data.rollup.record(result, timestamp.timestamp())
+    
     if result.get("status") != "success":
-        logger.warning(f"Not creating alert for unsuccessful analysis: {result.get('message')}")
+        logger.warning("Not creating alert for unsuccessful analysis: %s", result.get("message"))
+        if session_data.events:
+            session_data.events.record(result, timestamp.timestamp())
         return None
         
-    # Create a timestamp
-    now = datetime.now().isoformat()
+    now = timestamp.isoformat()
+    
+    # Keep a small thumbnail as evidence, since the screenshot itself is deleted soon
+    thumbnail = store_thumbnail(result, screenshot_path)
+    alert_level = result.get("alert_level", "UNKNOWN")
     
     # Extract data from the analysis result
     alert = Alert(
         message=result.get("message", "No message provided"),
         timestamp=now,
-        alert_level=result.get("alert_level", "UNKNOWN"),
+        alert_level=alert_level,
         confidence=result.get("confidence"),
-        screenshot_path=screenshot_path
+        # Backfilled frames are deleted from the spool once recorded; the thumbnail is the evidence
+        screenshot_path=None if result.get("late") else screenshot_path,
+        thumbnail=thumbnail,
+        late=bool(result.get("late"))
     )
     
     # Add to the alerts database
-    alerts_db.append(alert)
+    add_alert(alert)
     
     # Update session data
-    session_data.screenshots.append(result)
-    if result.get("alert_level") in [ALERT_LEVEL_CAUTION, ALERT_LEVEL_ALERT]:
-        session_data.alerts.append(result)
+    session_data.timeline.append(result, timestamp.timestamp())
+    if session_data.events:
+        session_data.events.record(result, timestamp.timestamp(), alert=True, thumbnail=thumbnail)
     
-    logger.info(f"Created {alert.alert_level} alert: {alert.message}")
+    logger.info("Created %s alert: %s", alert.alert_level, alert.message)
     return alert
 
+def store_thumbnail(result, screenshot_path):
+    """Store a WebP thumbnail for an analyzed screenshot if its level gets one; returns its URL"""
+    if not screenshot_path or (THUMBNAIL_LEVELS and result.get("alert_level", "UNKNOWN") not in THUMBNAIL_LEVELS):
+        return None
+    digest = get_thumbnail_store().add(screenshot_path)
+    return thumbnail_url(digest) if digest else None
+
+def record_late_result(result, screenshot_path, timestamp, session_id=None, goal=None, interval=None):
+    """Record a backfilled result against the session that captured the frame"""
+    if session_id is None or session_id == session_data.session_id:
+        return create_alert_from_analysis(result, screenshot_path,
+                                          timestamp=datetime.fromtimestamp(timestamp) if timestamp else None)
+    
+    # That session is over: only its own analytics and event log are updated, never the current session's
+    timestamp = timestamp or time.time()
+    SessionRollup(get_rollup_store(), goal, interval or 0).record(result, timestamp)
+    success = result.get("status") == "success"
+    thumbnail = store_thumbnail(result, screenshot_path) if success else None
+    SessionEvents(get_event_log(), session_id, goal).record(result, timestamp, alert=success, thumbnail=thumbnail)
+    logger.info("Recorded late %s result for ended session %s", result.get("alert_level"), session_id)
+    return None
+
+def record_idle_period(start, end):
+    """Record a stretch (epoch seconds) during which capture was suspended because the user was away"""
+    session_data.idle_periods.append((start, end))
+    session_data.idle_seconds += end - start
+
+def add_alert(alert):
+    """Keep an alert in memory, dropping the oldest beyond MAX_ALERTS_IN_MEMORY"""
+    alerts_db.append(alert)
+    excess = len(alerts_db) - settings.max_alerts_in_memory
+    if excess > 0:
+        del alerts_db[:excess]
+
 # Also add the missing get_latest_alert function that's referenced elsewhere
 def get_latest_alert():
     """Get the most recent alert"""
@@ -166,7 +244,7 @@ def get_latest_alert():
 @router.post("/alerts/", response_model=Alert)
 async def create_alert(alert: Alert):
     """Create a new alert"""
-    alerts_db.append(alert)
+    add_alert(alert)
     return alert
 
 @router.get("/alerts/", response_model=List[Alert])
@@ -196,9 +274,20 @@ async def get_session_status():
         start_time=datetime.fromtimestamp(monitor.start_time).isoformat() if monitor.start_time else None,
         elapsed_time=elapsed,
         goal=monitor.goal if hasattr(monitor, "goal") else None,
-        latest_alert=get_latest_alert()
+        latest_alert=get_latest_alert(),
+        is_idle=monitor.is_idle
     )
 
+@router.get("/session/model-stats")
+async def get_session_model_stats():
+    """Per-tier model call counts and escalation rates of the analysis cascade"""
+    return get_model_stats()
+
+@router.get("/session/scheduler-stats")
+async def get_session_scheduler_stats():
+    """Queue depth, dropped frames and model-slot wait times per session"""
+    return get_scheduler_stats()
+
 @router.post("/session/start")
 async def start_session():
     """Start the monitoring session"""
@@ -226,10 +315,11 @@ async def stop_session():
     """Stop the monitoring session"""
     logger.info("Stop session request received")
     # Stop monitoring but keep session data for summary
-    monitor.stop()
+    # (may wait briefly for an in-flight tick, so keep it off the event loop)
+    await run_in_threadpool(monitor.stop)
     
     # Reset to default API key
-    reset_api_key()
+    await reset_api_key_async()
     
     return {"message": "Session stopped", "status": "success"}
 
@@ -248,6 +338,7 @@ async def get_session_summary_endpoint():
             "screenshot_count": 0,
             "distraction_count": 0,
             "focus_percentage": 0,
+            "idle_time": 0,
             "summary": "No session data available to summarize.",
             "tips": ["Start a new focus session to track your productivity."]
         }
@@ -255,17 +346,17 @@ async def get_session_summary_endpoint():
     # Calculate session stats
     end_time = datetime.now()
     duration = (end_time - session_data.start_time).total_seconds()
+    idle_time = session_data.idle_seconds
+    if monitor.idle_since is not None:
+        idle_time += time.time() - monitor.idle_since  # Still away
     
-    screenshot_count = len(session_data.screenshots)
-    distraction_count = sum(1 for s in session_data.screenshots if s["alert_level"] in [ALERT_LEVEL_CAUTION, ALERT_LEVEL_ALERT])
-    
-    if screenshot_count > 0:
-        focus_percentage = ((screenshot_count - distraction_count) / screenshot_count) * 100
-    else:
-        focus_percentage = 100  # Default if no screenshots
+    stats = session_data.timeline.summary()
+    screenshot_count = stats["screenshot_count"]
+    distraction_count = stats["distraction_count"]
+    focus_percentage = stats["focus_percentage"]  # 100 if no screenshots
     
-    # Generate a summary text
-    summary_text, tips = generate_session_summary(
+    # Generate a summary text (model call runs off the event loop)
+    summary_text, tips = await get_session_summary_async(
         session_data.goal, 
         duration, 
         screenshot_count, 
@@ -273,14 +364,19 @@ async def get_session_summary_endpoint():
         focus_percentage
     )
     
-    logger.info(f"Generated session summary: {summary_text[:50]}...")
+    logger.info("Generated session summary: %s...", summary_text[:50])
     
     return {
         "goal": session_data.goal or "No goal specified",
         "duration": duration,
+        "idle_time": idle_time,
+        "active_duration": max(0.0, duration - idle_time),
         "screenshot_count": screenshot_count,
         "distraction_count": distraction_count,
         "focus_percentage": focus_percentage,
+        "distraction_episodes": stats["distraction_episodes"],
+        "longest_focus_streak": stats["longest_focus_streak"],
+        "mean_time_to_refocus": stats["mean_time_to_refocus"],
         "summary": summary_text,
         "tips": tips
     }
\ No newline at end of file
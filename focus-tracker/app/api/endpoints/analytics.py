@@ -0,0 +1,37 @@
+from fastapi import APIRouter, HTTPException
+from typing import Optional
+import time
+import logging
+from app.analytics.rollups import PERIODS, COUNTERS, get_rollup_store, with_derived_metrics
+
+router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+
+logger = logging.getLogger(__name__)
+
+@router.get("/goals")
+def get_goals():
+    """List the goals that have recorded analytics"""
+    return {"goals": get_rollup_store().goals()}
+
+@router.get("/trends")
+def get_trends(period: str = "day", days: int = 30, goal: Optional[str] = None):
+    """Focus trends from the precomputed hourly or daily rollups
+
+    Returns one entry per bucket that had activity, plus totals for the range.
+    Omit the goal to get totals across all goals.
+    """
+    if period not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of {sorted(PERIODS)}")
+    if days <= 0 or days > 366:
+        raise HTTPException(status_code=400, detail="days must be between 1 and 366")
+
+    end = time.time()
+    rows = get_rollup_store().buckets(period, end - days * 86400, end, goal)
+
+    totals = {counter: sum(row[counter] for row in rows) for counter in COUNTERS}
+    return {
+        "period": period,
+        "goal": goal,
+        "buckets": [with_derived_metrics(row) for row in rows],
+        "totals": with_derived_metrics(totals),
+    }
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import logging
+from app.analytics.events import get_event_log, iter_ndjson, iter_parquet, parse_time, pa
+
+router = APIRouter(prefix="/api/export", tags=["export"])
+
+logger = logging.getLogger(__name__)
+
+
+def _query_events(session_id, goal, start, end, level, status, alerts_only):
+    """Validate the export filters and return the (lazy) matching events"""
+    try:
+        start, end = parse_time(start), parse_time(end)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start and end must be epoch seconds or ISO-8601 times")
+    return get_event_log().query(session_id=session_id, goal=goal, start=start, end=end,
+                                 levels=level, statuses=status, alerts_only=alerts_only)
+
+
+@router.get("/sessions")
+def get_sessions():
+    """List the sessions that have exportable events"""
+    return {"sessions": get_event_log().sessions()}
+
+
+@router.get("/events.ndjson")
+def export_ndjson(session_id: Optional[str] = None, goal: Optional[str] = None,
+                  start: Optional[str] = None, end: Optional[str] = None,
+                  level: Optional[List[str]] = Query(None), status: Optional[List[str]] = Query(None),
+                  alerts_only: bool = False):
+    """Stream analysis events as newline-delimited JSON, oldest first
+
+    Filter by session, goal, time range ([start, end), epoch seconds or
+    ISO-8601), alert level and status; repeat level/status to match several.
+    """
+    events = _query_events(session_id, goal, start, end, level, status, alerts_only)
+    return StreamingResponse(iter_ndjson(events), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": 'attachment; filename="focus-events.ndjson"'})
+
+
+@router.get("/events.parquet")
+def export_parquet(session_id: Optional[str] = None, goal: Optional[str] = None,
+                   start: Optional[str] = None, end: Optional[str] = None,
+                   level: Optional[List[str]] = Query(None), status: Optional[List[str]] = Query(None),
+                   alerts_only: bool = False):
+    """Stream analysis events as a Parquet file, one row group at a time"""
+    if pa is None:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow on the server")
+    events = _query_events(session_id, goal, start, end, level, status, alerts_only)
+    return StreamingResponse(iter_parquet(events), media_type="application/vnd.apache.parquet",
+                             headers={"Content-Disposition": 'attachment; filename="focus-events.parquet"'})
@@ -0,0 +1,64 @@
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Header
+from typing import Optional
+import time
+import logging
+from app.core.settings import settings
+from app.mule.ingest import IngestQueue, valid_agent_id
+
+router = APIRouter(prefix="/api/ingest", tags=["ingest"])
+
+logger = logging.getLogger(__name__)
+
+_queue = None
+
+def get_queue():
+    """Return the shared ingest queue, creating its directories on first use"""
+    global _queue
+    if _queue is None:
+        _queue = IngestQueue()
+    return _queue
+
+def check_agent(agent_id, token):
+    if settings.ingest_token and token != settings.ingest_token:
+        raise HTTPException(status_code=401, detail="Invalid agent token")
+    if not valid_agent_id(agent_id):
+        raise HTTPException(status_code=400, detail="Invalid agent id")
+
+# Sync handlers: file writes run in the threadpool, not on the event loop
+@router.post("/frames", status_code=202)
+def ingest_frame(
+    agent_id: str = Form(...),
+    timestamp: float = Form(...),
+    goal: Optional[str] = Form(None),
+    duplicate: bool = Form(False),
+    frame: Optional[UploadFile] = File(None),
+    x_agent_token: Optional[str] = Header(None),
+):
+    """Accept a frame from a capture agent and queue it for analysis
+
+    Duplicates (no change since the agent's previous frame) carry no image and
+    reuse the previous verdict. The response includes the agent's most recent
+    verdict so agents can surface alerts without a separate poll.
+    """
+    check_agent(agent_id, x_agent_token)
+    if not duplicate and frame is None:
+        raise HTTPException(status_code=400, detail="Frame image required unless duplicate")
+
+    image_bytes = None
+    if not duplicate:
+        image_bytes = frame.file.read(settings.ingest_max_frame_bytes + 1)
+        if len(image_bytes) > settings.ingest_max_frame_bytes:
+            raise HTTPException(status_code=413, detail="Frame too large")
+
+    meta = {"timestamp": timestamp, "goal": goal, "received_at": time.time()}
+    frame_id = get_queue().put(agent_id, image_bytes, meta)
+    return {"frame_id": frame_id, "latest_result": get_queue().latest_result(agent_id)}
+
+@router.get("/agents/{agent_id}/latest")
+def get_latest_result(agent_id: str, x_agent_token: Optional[str] = Header(None)):
+    """Get the most recent verdict for an agent"""
+    check_agent(agent_id, x_agent_token)
+    result = get_queue().latest_result(agent_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No results for this agent yet")
+    return result
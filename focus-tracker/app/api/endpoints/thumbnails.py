@@ -0,0 +1,24 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+import logging
+from app.utils.thumbnails import get_thumbnail_store
+
+router = APIRouter(prefix="/api/thumbnails", tags=["thumbnails"])
+
+logger = logging.getLogger(__name__)
+
+# A digest always names the same bytes, so clients never need to revalidate
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+@router.get("/{digest}.webp")
+def get_thumbnail(digest: str, request: Request):
+    """Serve an alert's evidence thumbnail by content hash"""
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    data = get_thumbnail_store().get(digest)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    return Response(content=data, media_type="image/webp", headers=headers)
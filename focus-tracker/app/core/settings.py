@@ -14,10 +14,87 @@ class Settings(BaseSettings):
     alert_threshold: int = 3
     debug: bool = False
 
+    # Screen capture backend: "pyautogui", "x11" (mss, MIT-SHM) or "synthetic"
+    capture_backend: str = "pyautogui"
+    capture_monitor: int = 1  # 1-based monitor index for the x11 backend, 0 = all monitors
+    capture_region: str = ""  # Optional "left,top,width,height" capture region
+    synthetic_source_dir: str = ""  # Frames to replay with the synthetic backend
+    image_workers: int = 2  # Processes for PNG encoding and resizing (0 = in the capturing thread)
+
+    # Idle detection: capture and analysis are suspended while the user is away
+    idle_detection: bool = True
+    idle_timeout: float = 120.0  # Seconds without pointer movement or screen changes before going idle
+    idle_poll_interval: float = 1.0  # Seconds between pointer/lock checks while idle
+    idle_frame_change_threshold: float = 1.5  # Mean grayscale change between frames that counts as activity
+
+    # Model backend: "gemini" or "fake" (local deterministic stand-in for offline runs)
+    model_backend: str = "gemini"
+    fake_model_latency: float = 0.0  # Simulated latency of the fake model, in seconds
+    model_max_concurrency: int = 4  # Model calls allowed in flight from API handlers
+
+    # Scheduling of frame analyses across sessions (live monitor, capture agents, backfill)
+    scheduler_concurrency: int = 4  # Frame analyses in flight at once
+    scheduler_key_rpm: float = 60  # Requests per minute allowed per API key (0 = unlimited)
+    scheduler_session_rpm: float = 30  # Requests per minute allowed per session (0 = unlimited)
+    scheduler_burst: int = 3  # Token bucket capacity for both limits
+    scheduler_max_frame_age: float = 30.0  # Frames waiting longer than this are dropped (0 = never)
+    scheduler_max_queue_per_session: int = 3  # Frames kept in a capture agent's backlog, newest win (0 = all)
+    scheduler_late_weight: float = 0.5  # Fair-queuing weight of backfill sessions (live sessions have 1)
+    scheduler_idle_expiry: float = 600.0  # Seconds after which idle sessions and API keys are forgotten
+
+    # Analysis model cascade: comma-separated tiers, cheapest first, e.g.
+    # "gemini-1.5-flash-8b,gemini-1.5-flash,gemini-1.5-pro". Frames escalate to the
+    # next tier when confidence is below the threshold or the alert level would change.
+    model_tiers: str = "gemini-1.5-flash"
+    cascade_confidence_threshold: float = 70
+    cascade_escalate_on_change: bool = True
+    cascade_downscale_width: int = 0  # Width of the frame sent to the cheaper tiers (0 = full size)
+    summary_model: str = "gemini-1.5-flash"
+    analysis_history_turns: int = 4  # Previous exchanges sent back with each frame (0 = none)
+
+    analytics_db_path: str = "focus_analytics.db"  # SQLite file holding the cross-session rollups
+    max_alerts_in_memory: int = 1000  # Recent alerts served by /api/alerts/ (all are kept in the event log)
+
+    # Alert evidence: WebP thumbnails stored once per content hash, least recently used evicted first
+    thumbnail_dir: str = "thumbnails"
+    thumbnail_max_bytes: int = 100 * 1024 * 1024
+    thumbnail_width: int = 320
+    thumbnail_quality: int = 60
+    thumbnail_levels: str = "CAUTION,ALERT"  # Alert levels that keep a thumbnail (empty = all)
+
+    # Frames captured while the model is unreachable are spooled and backfilled later
+    spool_dir: str = "spool"
+    spool_max_bytes: int = 200 * 1024 * 1024
+    backfill_rate_per_minute: float = 6  # Spooled frames analyzed per minute after recovery
+    backfill_batch_size: int = 3
+
+    # Split deployment: capture agents upload frames, analysis workers pull them from ingest_dir
+    ingest_dir: str = "ingest"  # Shared by the API and every worker process
+    ingest_workers: int = 0  # Analysis worker threads to run inside the API process
+    ingest_token: str = ""  # Shared secret agents must send as X-Agent-Token (empty = open)
+    ingest_max_frame_bytes: int = 8 * 1024 * 1024
+    ingest_batch_size: int = 10  # Frames a worker processes per agent claim
+    ingest_poll_interval: float = 0.5  # Seconds an idle worker waits before polling again
+    ingest_claim_timeout: float = 120.0  # Claims older than this are considered abandoned
+    ingest_results_max_bytes: int = 10 * 1024 * 1024  # Per-agent results log size before it rotates (0 = never)
+    ingest_max_agents: int = 256  # Agents whose alert history a worker keeps (least recently seen dropped)
+    agent_max_width: int = 1600  # Agents downscale wider frames before upload
+    agent_jpeg_quality: int = 70
+    agent_dedup_threshold: float = 1.5  # Mean grayscale change below which a frame counts as unchanged
+
+    # Logging: records are queued and written by a background listener thread
+    log_level: str = "INFO"
+    log_levels: str = ""  # Per-module overrides, e.g. "app.utils.image_analysis=DEBUG,app.watcher=WARNING"
+    log_format: str = "text"  # "text" or "json" (one object per line)
+    log_file: str = ""  # Optional rotating log file, in addition to stderr
+    log_file_max_bytes: int = 10 * 1024 * 1024
+    log_rate_limit_per_minute: int = 6  # INFO/DEBUG records allowed per call site per minute (0 = unlimited)
+
     # Update Config to use SettingsConfigDict and allow extra fields
     model_config = SettingsConfigDict(
         env_file=".env",
-        extra="ignore"  # This will ignore extra fields in the environment
+        extra="ignore",  # This will ignore extra fields in the environment
+        protected_namespaces=("settings_",)  # Allow model_* field names
     )
 
 # Create a global settings instance
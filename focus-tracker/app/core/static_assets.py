@@ -0,0 +1,152 @@
+# app/core/static_assets.py
+"""In-memory, precompressed static assets for the dashboard.
+
+Every file under the static directory is read once at startup, hashed for a
+strong ETag and compressed with gzip (and brotli when the module is
+installed). index.html is rewritten so its /static/ references carry a
+?v=<hash> fingerprint; fingerprinted URLs are served as immutable, while
+index.html itself is revalidated with its ETag on every load.
+"""
+import os
+import re
+import gzip
+import hashlib
+import mimetypes
+import logging
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+MIN_COMPRESS_BYTES = 512
+STATIC_REFERENCE = re.compile(r'(?P<attr>(?:src|href)=")(?P<url>/static/[^"?#]+)(?P<end>")')
+
+
+def parse_accept_encoding(header):
+    """Map each content coding in an Accept-Encoding header to its q-value"""
+    weights = {}
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    return weights
+
+
+def choose_encoding(header, available):
+    """The available compressed encoding with the highest q-value, else identity"""
+    weights = parse_accept_encoding(header)
+    default = weights.get("*", 0.0)
+    best, best_q = "identity", 0.0
+    for candidate in ("br", "gzip"):  # Smallest first, so it wins ties
+        q = weights.get(candidate, default)
+        if candidate in available and q > best_q:
+            best, best_q = candidate, q
+    return best
+
+
+class StaticAsset:
+    def __init__(self, body, media_type):
+        self.media_type = media_type
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        # Encoded variants, each with its own strong ETag
+        self.variants = {"identity": body}
+        if media_type.startswith(COMPRESSIBLE_TYPES) and len(body) >= MIN_COMPRESS_BYTES:
+            self.variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(body, quality=11)
+
+    def etag(self, encoding):
+        return f'"{self.digest}-{encoding}"' if encoding != "identity" else f'"{self.digest}"'
+
+
+class StaticAssets:
+    """Loads a static directory into memory and serves it with caching headers"""
+
+    def __init__(self, directory, index="index.html"):
+        self.directory = directory
+        self.index_name = index
+        self.assets = {}
+        self.load()
+
+    def load(self):
+        assets = {}
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    body = f.read()
+                media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                if media_type == "application/javascript":
+                    # Starlette only adds the charset for text/* types
+                    media_type += "; charset=utf-8"
+                assets[relative] = StaticAsset(body, media_type)
+
+        # Fingerprint the asset URLs referenced by the index page
+        if self.index_name in assets:
+            index = assets[self.index_name]
+            html = index.variants["identity"].decode("utf-8")
+            html = STATIC_REFERENCE.sub(lambda m: self._fingerprint(m, assets), html)
+            assets[self.index_name] = StaticAsset(html.encode("utf-8"), index.media_type)
+
+        self.assets = assets
+        total = sum(len(a.variants["identity"]) for a in assets.values())
+        logger.info("Loaded %s static assets (%s bytes) from %s", len(assets), total, self.directory)
+
+    @staticmethod
+    def _fingerprint(match, assets):
+        asset = assets.get(match.group("url")[len("/static/"):])
+        if asset is None:
+            return match.group(0)
+        return f'{match.group("attr")}{match.group("url")}?v={asset.digest}{match.group("end")}'
+
+    @property
+    def index(self):
+        return self.assets.get(self.index_name)
+
+    def response(self, request: Request, asset: StaticAsset, cache_control):
+        """Build a response for the best encoding the client accepts, or a 304"""
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""), asset.variants)
+
+        etag = asset.etag(encoding)
+        headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+        body = asset.variants[encoding]
+        if request.method == "HEAD":
+            headers["Content-Length"] = str(len(body))
+            return Response(media_type=asset.media_type, headers=headers)
+        return Response(content=body, media_type=asset.media_type, headers=headers)
+
+    def serve(self, request: Request, path):
+        """Serve /static/<path>; fingerprinted URLs get long-lived immutable caching"""
+        asset = self.assets.get(path)
+        if asset is None:
+            return Response(status_code=404)
+        fingerprinted = request.query_params.get("v") == asset.digest
+        return self.response(request, asset, IMMUTABLE_CACHE if fingerprinted else REVALIDATE_CACHE)
+
+    def serve_index(self, request: Request):
+        return self.response(request, self.index, REVALIDATE_CACHE)
@@ -3,16 +3,15 @@ import time
 import logging
 import os
 import glob
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from app.api.endpoints import alerts
+from app.api.endpoints import alerts, analytics, export, ingest, thumbnails
 from app.core.settings import settings
+from app.core.logging_config import setup_logging
+from app.core.static_assets import StaticAssets
 
-# Configure logging
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Configure logging (queued, written by a background thread)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Function to clean screenshots directory
@@ -27,14 +26,14 @@ def clean_screenshots_directory():
             try:
                 if os.path.isfile(f):
                     os.remove(f)
-                    logger.info(f"Startup cleanup: Removed old screenshot: {f}")
+                    logger.info("Startup cleanup: Removed old screenshot: %s", f)
             except Exception as e:
-                logger.error(f"Error removing file {f}: {e}")
-        logger.info(f"Cleaned screenshots directory: {screenshots_dir}")
+                logger.error("Error removing file %s: %s", f, e)
+        logger.info("Cleaned screenshots directory: %s", screenshots_dir)
     else:
         # Create the directory if it doesn't exist
         os.makedirs(screenshots_dir)
-        logger.info(f"Created screenshots directory at {screenshots_dir}")
+        logger.info("Created screenshots directory at %s", screenshots_dir)
 
 # Clean screenshots directory on startup
 clean_screenshots_directory()
@@ -54,31 +53,51 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include our router
+# Include our routers
 app.include_router(alerts.router)
+app.include_router(analytics.router)
+app.include_router(ingest.router)
+app.include_router(thumbnails.router)
+app.include_router(export.router)
+
+# Optionally analyze agent uploads inside this process as well
+analysis_worker = None
+
+@app.on_event("startup")
+def start_analysis_workers():
+    global analysis_worker
+    if settings.ingest_workers > 0:
+        from app.mule.worker import AnalysisWorker
+        analysis_worker = AnalysisWorker(ingest.get_queue())
+        analysis_worker.start(settings.ingest_workers)
+
+@app.on_event("shutdown")
+def stop_analysis_workers():
+    if analysis_worker:
+        analysis_worker.stop()
 
 # Find the correct path to the static directory
 static_directory = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
-logger.info(f"Serving static files from: {static_directory}")
+logger.info("Serving static files from: %s", static_directory)
+
+# Load and precompress the static files once; they are served from memory
+static_assets = StaticAssets(static_directory)
 
-# Mount static files directory
-app.mount("/static", StaticFiles(directory=static_directory), name="static")
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"])
+async def static_files(path: str, request: Request):
+    """Serve a static asset with ETag and cache headers"""
+    return static_assets.serve(request, path)
 
 @app.get("/")
-async def read_root():
+async def read_root(request: Request):
     """Root endpoint - serve the index.html file"""
-    index_path = os.path.join(static_directory, "index.html")
-    logger.info(f"Serving index.html from: {index_path}")
-    if os.path.exists(index_path):
-        return FileResponse(index_path)
-    else:
-        logger.error(f"Index file not found at: {index_path}")
+    if static_assets.index is None:
         return {"error": "Index file not found"}
+    return static_assets.serve_index(request)
 
 @app.get("/health")
 def health_check():
     """Health check endpoint"""
-    logger.info("Health check request received")
     return {
         "status": "healthy",
         "timestamp": time.time(),
@@ -87,12 +106,8 @@ def health_check():
 
 # Add a catch-all route at the end of the file to handle page refreshes
 @app.get("/{full_path:path}")
-async def catch_all(full_path: str):
+async def catch_all(full_path: str, request: Request):
     """Handle all other routes - serves the index.html for client-side routing"""
-    index_path = os.path.join(static_directory, "index.html")
-    logger.info(f"Catch-all route accessed for path: {full_path} - serving index.html")
-    if os.path.exists(index_path):
-        return FileResponse(index_path)
-    else:
-        logger.error(f"Index file not found at: {index_path}")
-        return {"error": "Index file not found"}
\ No newline at end of file
+    if static_assets.index is None:
+        return {"error": "Index file not found"}
+    return static_assets.serve_index(request)
@@ -0,0 +1,202 @@
+# app/mule/ingest.py
+"""Shared frame queue between the ingest endpoint and the analysis workers.
+
+The queue lives in a directory (settings.ingest_dir) so any number of worker
+processes, on this host or on others mounting the same storage, can pull from
+it. Layout:
+
+    incoming/<agent_id>/<ts_ms>_<seq>.jpg   uploaded frame (absent for duplicates)
+    incoming/<agent_id>/<ts_ms>_<seq>.json  frame metadata
+    claims/<agent_id>/owner                 token of the worker analyzing that agent
+    results/<agent_id>.jsonl                recent verdicts, in order (older ones in .jsonl.1)
+    results/<agent_id>.latest.json          most recent verdict
+
+A worker claims a whole agent (an atomic mkdir) and processes its frames in
+capture order, so each desktop's alert history stays sequential while
+different desktops are analyzed in parallel. The claim holds the owner's
+token: a worker whose claim was taken over after claim_timeout can no longer
+renew or release it.
+"""
+import os
+import re
+import json
+import glob
+import time
+import threading
+import logging
+import uuid
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+AGENT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+def valid_agent_id(agent_id):
+    return bool(AGENT_ID_PATTERN.match(agent_id or "")) and agent_id not in (".", "..")
+
+
+class IngestQueue:
+    def __init__(self, directory=None, claim_timeout=None, results_max_bytes=None):
+        self.directory = directory or settings.ingest_dir
+        self.claim_timeout = claim_timeout or settings.ingest_claim_timeout
+        self.results_max_bytes = (results_max_bytes if results_max_bytes is not None
+                                  else settings.ingest_results_max_bytes)
+        self.incoming_dir = os.path.join(self.directory, "incoming")
+        self.claims_dir = os.path.join(self.directory, "claims")
+        self.results_dir = os.path.join(self.directory, "results")
+        for path in (self.incoming_dir, self.claims_dir, self.results_dir):
+            os.makedirs(path, exist_ok=True)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    # Producer side (ingest endpoint)
+
+    def put(self, agent_id, image_bytes, meta):
+        """Queue a frame (image_bytes=None for a duplicate of the previous one)"""
+        if not valid_agent_id(agent_id):
+            raise ValueError(f"Invalid agent id: {agent_id}")
+        agent_dir = os.path.join(self.incoming_dir, agent_id)
+        os.makedirs(agent_dir, exist_ok=True)
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        name = f"{int(meta['timestamp'] * 1000):013d}_{os.getpid()}_{seq:06d}"
+        base = os.path.join(agent_dir, name)
+
+        if image_bytes is not None:
+            self._write_atomic(base + ".jpg", image_bytes, binary=True)
+            meta = dict(meta, image=name + ".jpg")
+        # Metadata is written last: a frame only becomes visible once it is complete
+        self._write_atomic(base + ".json", json.dumps(meta))
+        return name
+
+    @staticmethod
+    def _write_atomic(path, data, binary=False):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb" if binary else "w") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    # Consumer side (analysis workers)
+
+    def agents_with_work(self):
+        """Agent ids that have queued frames"""
+        agents = []
+        for agent_dir in glob.glob(os.path.join(self.incoming_dir, "*")):
+            if glob.glob(os.path.join(agent_dir, "*.json")):
+                agents.append(os.path.basename(agent_dir))
+        return agents
+
+    def claim(self, agent_id):
+        """Try to take exclusive ownership of an agent's frames; returns the owner token or None"""
+        claim_path = os.path.join(self.claims_dir, agent_id)
+        token = uuid.uuid4().hex
+        try:
+            os.mkdir(claim_path)
+            self._write_atomic(os.path.join(claim_path, "owner"), token)
+            return token
+        except FileExistsError:
+            pass
+        # Steal claims left behind by workers that died (or stalled past claim_timeout)
+        try:
+            stat = os.stat(claim_path)
+        except FileNotFoundError:
+            return self.claim(agent_id)
+        if time.time() - stat.st_mtime <= self.claim_timeout:
+            return None
+        # Every worker that saw this stale claim tries to create the same marker
+        # inside it; mkdir is atomic, so exactly one of them takes over
+        marker = os.path.join(claim_path, f"takeover-{stat.st_ino}-{stat.st_mtime_ns}")
+        try:
+            os.mkdir(marker)
+            # Fences off the previous owner: its renew() and release() no longer match
+            self._write_atomic(os.path.join(claim_path, "owner"), token)
+        except (FileExistsError, FileNotFoundError):
+            return None
+        os.utime(claim_path)
+        logger.warning("Took over stale claim for agent %s", agent_id)
+        return token
+
+    def owns(self, agent_id, token):
+        """Whether token still holds the agent's claim"""
+        try:
+            with open(os.path.join(self.claims_dir, agent_id, "owner")) as f:
+                return f.read() == token
+        except FileNotFoundError:
+            return False
+
+    def renew(self, agent_id, token):
+        """Keep a claim alive while working through a long backlog; False once it was taken over"""
+        if not self.owns(agent_id, token):
+            return False
+        try:
+            os.utime(os.path.join(self.claims_dir, agent_id))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def release(self, agent_id, token):
+        """Give up a claim, unless another worker has taken it over since"""
+        if not self.owns(agent_id, token):
+            return
+        claim_path = os.path.join(self.claims_dir, agent_id)
+        try:
+            # Takeover markers stay until release, so a late worker can't win the same takeover
+            for name in os.listdir(claim_path):
+                path = os.path.join(claim_path, name)
+                if os.path.isdir(path):
+                    os.rmdir(path)
+                else:
+                    os.remove(path)
+            os.rmdir(claim_path)
+        except FileNotFoundError:
+            pass
+
+    def pending(self, agent_id, limit=None):
+        """Queued (meta, image_path) frames of an agent, oldest first"""
+        agent_dir = os.path.join(self.incoming_dir, agent_id)
+        frames = []
+        for meta_path in sorted(glob.glob(os.path.join(agent_dir, "*.json")))[:limit]:
+            try:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error("Dropping unreadable frame metadata %s: %s", meta_path, e)
+                os.remove(meta_path)
+                continue
+            meta["_meta_path"] = meta_path
+            image = meta.get("image")
+            frames.append((meta, os.path.join(agent_dir, image) if image else None))
+        return frames
+
+    def complete(self, meta, image_path):
+        """Remove a processed frame from the queue"""
+        for path in (image_path, meta["_meta_path"]):
+            if path:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    # Results
+
+    def write_result(self, agent_id, result, latest=True):
+        """Append a result to the agent's log and, unless latest=False, make it the latest verdict"""
+        line = json.dumps(result)
+        log_path = os.path.join(self.results_dir, f"{agent_id}.jsonl")
+        with open(log_path, "a") as f:
+            f.write(line + "\n")
+            size = f.tell()
+        # Only the claim owner writes an agent's results, so rotating needs no lock
+        if self.results_max_bytes and size > self.results_max_bytes:
+            os.replace(log_path, log_path + ".1")
+        if latest:
+            self._write_atomic(os.path.join(self.results_dir, f"{agent_id}.latest.json"), line)
+
+    def latest_result(self, agent_id):
+        try:
+            with open(os.path.join(self.results_dir, f"{agent_id}.latest.json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
@@ -1,25 +1,57 @@
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 import os
 from app.utils.image_analysis import GeminiAnalyzer
+from app.utils.model_client import model_clients
+from app.mule.scheduler import get_scheduler
 from app.core.settings import settings
 
 class Processor:
-    def __init__(self):
-        self.analyzer = GeminiAnalyzer()
+    def __init__(self, analyzer=None, session_id="local", late_analyzer=None):
+        self.analyzer = analyzer or GeminiAnalyzer()
+        # Late frames are analyzed on another thread, so they get their own analyzer state
+        self._late_analyzer = late_analyzer
+        # Identifies this processor's frames to the model scheduler
+        self.session_id = session_id
         self.user_goal = None
         self.consecutive_alerts = 0
+        self.last_alert_level = None
         
     def set_user_goal(self, goal: str):
         """Set the user's goal for the session"""
         self.user_goal = goal
         
-    def process_screenshot(self, screenshot_path: str) -> Dict:
+    def process_screenshot(self, screenshot_path: str, captured_at: Optional[float] = None) -> Dict:
         """Process a single screenshot"""
         if not os.path.exists(screenshot_path):
             return {"status": "error", "alert_level": "ERROR", "message": f"Screenshot not found: {screenshot_path}"}
             
-        # Analyze the screenshot
-        result = self.analyzer.analyze_image(screenshot_path, self.user_goal)
+        # Analyze the screenshot once the scheduler gives this session a model slot;
+        # frames right after a CAUTION go ahead of other sessions
+        goal = self.user_goal
+        result = get_scheduler().run(
+            self.session_id,
+            lambda: self.analyzer.analyze_image(screenshot_path, goal),
+            api_key=model_clients.api_key,
+            captured_at=captured_at or os.path.getmtime(screenshot_path),
+            priority=self.last_alert_level == "CAUTION",
+        )
+        if result.get("shed"):
+            # Dropped under load: not a verdict, so leave the alert tracking alone
+            result["screenshot_path"] = screenshot_path
+            return result
+        return self.record_result(result, screenshot_path)
+        
+    @property
+    def late_analyzer(self):
+        """Analyzer for late frames, sharing the live analyzer's models but none of its state"""
+        if self._late_analyzer is None:
+            self._late_analyzer = GeminiAnalyzer(tiers=getattr(self.analyzer, "tiers", None))
+        return self._late_analyzer
+        
+    def record_result(self, result: Dict, screenshot_path: str) -> Dict:
+        """Update consecutive alert tracking for an analyzed screenshot"""
+        if result.get("status") == "success":
+            self.last_alert_level = result.get("alert_level")
         
         # Track consecutive alerts
         if result.get("alert_level") == "ALERT":
@@ -33,6 +65,35 @@ class Processor:
         
         return result
         
+    def analyze_late(self, frames: List[Tuple[str, Optional[str]]]) -> List[Dict]:
+        """Analyze (path, goal) frames captured earlier, e.g. during an outage.
+        
+        Late frames don't go through the live alert history or consecutive
+        alert tracking, which only make sense for frames arriving in order.
+        Escalation on a level change compares each frame with the previous
+        late frame of the same goal in this batch.
+        """
+        results = []
+        previous = (None, None)  # (goal, alert level) of the previous late frame
+        for screenshot_path, goal in frames:
+            if not os.path.exists(screenshot_path):
+                results.append({"status": "error", "alert_level": "ERROR", "message": f"Screenshot not found: {screenshot_path}"})
+                continue
+            goal = goal or self.user_goal
+            previous_level = previous[1] if previous[0] == goal else None
+            # Late frames are never stale, but still share the model slots and quota fairly
+            result = get_scheduler().run(
+                f"{self.session_id}:late",
+                lambda: self.late_analyzer.analyze_raw(screenshot_path, goal, use_history=False,
+                                                       previous_level=previous_level),
+                api_key=model_clients.api_key,
+            )
+            if result.get("status") == "success":
+                previous = (goal, result.get("alert_level"))
+            result["screenshot_path"] = screenshot_path
+            results.append(result)
+        return results
+        
     def process_screenshots(self, screenshots: List[str]) -> List[Dict]:
         """Process multiple screenshots"""
         results = []
@@ -0,0 +1,227 @@
+# app/mule/replay.py
+"""Replay recorded screenshot sessions through the analysis pipeline.
+
+Frames from a directory (or a .zip/.tar archive) are fed through the
+Processor, the analyzer's alert history and the alert path, either at the
+cadence they were recorded at or as fast as possible. The verdict timeline
+and aggregate stats are written out, which makes this both a regression
+check for the escalation logic and a throughput load test.
+
+Usage:
+    python -m app.mule.replay recordings/session1 --goal "Write the report" --concurrency 4
+    python -m app.mule.replay session.zip --realtime --speed 10 --fake-model --output timeline.jsonl
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+import tarfile
+import tempfile
+import time
+import zipfile
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from app.core.logging_config import setup_logging
+from app.mule.processor import Processor
+from app.utils.image_analysis import GeminiAnalyzer, get_model_tiers
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+# Matches the names written by ScreenshotTaker, e.g. screenshot_20240101_093000.png
+TIMESTAMP_PATTERN = re.compile(r"(\d{8}_\d{6})")
+
+
+def frame_timestamp(path):
+    """Get a frame's capture time from its filename, falling back to the file mtime"""
+    match = TIMESTAMP_PATTERN.search(os.path.basename(path))
+    if match:
+        try:
+            return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").timestamp()
+        except ValueError:
+            pass
+    return os.path.getmtime(path)
+
+
+def extract_archive(archive_path, target_dir):
+    """Extract a .zip or .tar(.gz) archive of frames into target_dir"""
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as zf:
+            zf.extractall(target_dir)
+    elif tarfile.is_tarfile(archive_path):
+        with tarfile.open(archive_path) as tf:
+            if hasattr(tarfile, "data_filter"):
+                tf.extractall(target_dir, filter="data")
+            else:
+                tf.extractall(target_dir)
+    else:
+        raise ValueError(f"Unsupported archive: {archive_path}")
+
+
+def load_frames(directory):
+    """Return (timestamp, path) pairs for all frames under directory, oldest first"""
+    paths = [p for p in glob.glob(os.path.join(directory, "**", "*"), recursive=True)
+             if p.lower().endswith(IMAGE_EXTENSIONS)]
+    frames = [(frame_timestamp(p), p) for p in paths]
+    frames.sort()
+    return frames
+
+
+def percentile(values, pct):
+    """Return the given percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Replayer:
+    """Feed recorded frames through the same path the live monitor uses"""
+
+    def __init__(self, processor, goal=None, concurrency=1, realtime=False, speed=1.0, create_alerts=True):
+        self.processor = processor
+        self.analyzer = processor.analyzer
+        self.goal = goal
+        self.concurrency = max(1, concurrency)
+        self.realtime = realtime
+        self.speed = speed
+        self.create_alerts = create_alerts
+        self.timeline = []
+
+    def _analyze(self, path):
+        """Run the model call for one frame (may run on a worker thread)"""
+        start = time.perf_counter()
+        # Sequential replays keep the chat history, exactly like a live session
+        raw = self.analyzer.analyze_raw(path, self.goal, use_history=self.concurrency == 1)
+        return raw, time.perf_counter() - start
+
+    def _finalize(self, timestamp, path, future):
+        """Apply the alert history and alert path to a frame, in capture order"""
+        raw, latency = future.result()
+        if raw.get("status") == "success":
+            result = self.analyzer.process_result_history(raw)
+        else:
+            result = raw
+        result = self.processor.record_result(result, path)
+
+        alert = None
+        if self.create_alerts:
+            from app.api.endpoints.alerts import create_alert_from_analysis
+            alert = create_alert_from_analysis(result, path, timestamp=datetime.fromtimestamp(timestamp))
+
+        self.timeline.append({
+            "timestamp": datetime.fromtimestamp(timestamp).isoformat(),
+            "frame": os.path.basename(path),
+            "status": result.get("status"),
+            "raw_alert_level": raw.get("alert_level"),
+            "alert_level": result.get("alert_level"),
+            "confidence": result.get("confidence"),
+            "consecutive_alerts": result.get("consecutive_alerts", 0),
+            "alert_created": alert is not None,
+            "latency": latency,
+        })
+
+    def run(self, frames):
+        """Replay the frames and return the aggregate stats"""
+        self.timeline = []
+        self.processor.set_user_goal(self.goal)
+        if self.create_alerts and frames:
+            from app.api.endpoints.alerts import session_data
+            session_data.reset()
+            session_data.start_time = datetime.fromtimestamp(frames[0][0])
+            session_data.goal = self.goal
+
+        wall_start = time.perf_counter()
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for timestamp, path in frames:
+                if self.realtime:
+                    due = wall_start + (timestamp - frames[0][0]) / self.speed
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                pending.append((timestamp, path, executor.submit(self._analyze, path)))
+                # Bound the number of in-flight frames and finalize results in order
+                while len(pending) > self.concurrency:
+                    self._finalize(*pending.popleft())
+            while pending:
+                self._finalize(*pending.popleft())
+
+        return self.stats(time.perf_counter() - wall_start)
+
+    def stats(self, wall_time):
+        """Aggregate the replayed timeline"""
+        successes = [row for row in self.timeline if row["status"] == "success"]
+        levels = Counter(row["alert_level"] for row in successes)
+        raw_levels = Counter(row["raw_alert_level"] for row in successes)
+        distractions = levels["CAUTION"] + levels["ALERT"]
+        latencies = [row["latency"] for row in self.timeline]
+
+        return {
+            "frames": len(self.timeline),
+            "analyzed": len(successes),
+            "errors": len(self.timeline) - len(successes),
+            "alert_levels": dict(levels),
+            "raw_alert_levels": dict(raw_levels),
+            "escalations": levels["ALERT"],
+            "alerts_created": sum(1 for row in self.timeline if row["alert_created"]),
+            "focus_percentage": ((len(successes) - distractions) / len(successes) * 100) if successes else 100,
+            "wall_time": wall_time,
+            "frames_per_second": len(self.timeline) / wall_time if wall_time else 0,
+            "latency_mean": sum(latencies) / len(latencies) if latencies else 0,
+            "latency_p50": percentile(latencies, 50),
+            "latency_p95": percentile(latencies, 95),
+            "model_tiers": self.analyzer.get_tier_stats(),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded screenshot session through the pipeline")
+    parser.add_argument("source", help="Directory or .zip/.tar archive of timestamped frames")
+    parser.add_argument("--goal", default=None, help="Goal to analyze the frames against")
+    parser.add_argument("--realtime", action="store_true", help="Replay at the original capture cadence")
+    parser.add_argument("--speed", type=float, default=1.0, help="Cadence multiplier for --realtime")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent model calls")
+    parser.add_argument("--fake-model", action="store_true", help="Use the local fake model instead of Gemini")
+    parser.add_argument("--fake-latency", type=float, default=0.0, help="Simulated fake model latency (seconds)")
+    parser.add_argument("--no-alerts", action="store_true", help="Skip the alert path")
+    parser.add_argument("--output", help="Write the verdict timeline as JSON lines to this file")
+    args = parser.parse_args()
+
+    setup_logging(level=logging.WARNING)
+
+    tiers = None
+    if args.fake_model:
+        from app.utils.fake_model import FakeGenerativeModel
+        tiers = [(name, FakeGenerativeModel(name, latency=args.fake_latency)) for name in get_model_tiers()]
+    processor = Processor(GeminiAnalyzer(tiers=tiers))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = args.source
+        if os.path.isfile(source):
+            extract_archive(source, tmp)
+            source = tmp
+        frames = load_frames(source)
+        if not frames:
+            parser.error(f"No frames found in {args.source}")
+
+        replayer = Replayer(processor, goal=args.goal, concurrency=args.concurrency, realtime=args.realtime,
+                            speed=args.speed, create_alerts=not args.no_alerts)
+        stats = replayer.run(frames)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            for row in replayer.timeline:
+                f.write(json.dumps(row) + "\n")
+    else:
+        for row in replayer.timeline:
+            print(f"{row['timestamp']} {row['frame']:<40} {row['raw_alert_level'] or '-':<8} -> "
+                  f"{row['alert_level']:<8} conf={row['confidence']}")
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+# app/mule/scheduler.py
+"""Fair, quota-aware admission for model calls across sessions.
+
+Every frame analysis (the live monitor, each capture agent, backfill) asks
+the scheduler for a slot before calling the model, and runs on its own
+thread once admitted. The scheduler decides who goes next:
+
+- at most `concurrency` analyses are in flight at once;
+- per-API-key and per-session token buckets keep each key under its quota
+  and stop one fast-interval session from using up the whole key;
+- among sessions with tokens, start-time fair queuing shares the slots in
+  proportion to session weights (backfill sessions, named "<session>:late",
+  get late_weight so a recovering outage doesn't crowd out live frames);
+- frames that follow a CAUTION verdict jump ahead of the other sessions,
+  since that's when a fast answer matters most;
+- under pressure, frames that waited longer than max_frame_age (measured on
+  this server's clock) are dropped rather than analyzed late.
+
+Every session submits its frames one at a time from a single thread, so a
+backlog builds up before the scheduler, not in it: capture agents' frames
+wait in the ingest queue, where AnalysisWorker drops superseded ones and
+reports them here with record_shed().
+
+Per-session wait times, queue depths and shed counts are kept for stats().
+Sessions and API keys that stay idle for idle_expiry seconds are forgotten;
+keys are only held as a hash.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import deque
+from itertools import count
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Ticket states
+WAITING, ADMITTED, SHED = "waiting", "admitted", "shed"
+
+
+class TokenBucket:
+    """Refills at `rate` tokens per second up to `capacity`; rate 0 means unlimited"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        if self.rate > 0:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready(self):
+        return self.rate <= 0 or self.tokens >= 1.0
+
+    def consume(self, amount=1.0):
+        # May go negative: cascade escalations are charged after the fact
+        if self.rate > 0:
+            self.tokens -= amount
+
+    def wait_time(self):
+        """Seconds until one token is available"""
+        if self.ready():
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+
+class Ticket:
+    __slots__ = ("seq", "session", "api_key", "captured_at", "priority", "enqueued", "state", "reason")
+
+    def __init__(self, seq, session, api_key, captured_at, priority):
+        self.seq = seq
+        self.session = session
+        self.api_key = api_key
+        self.captured_at = captured_at
+        self.priority = priority
+        self.enqueued = time.monotonic()
+        self.state = WAITING
+        self.reason = None
+
+
+def key_id(api_key):
+    """Short hash identifying an API key without keeping the key itself"""
+    return hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+
+
+class SessionState:
+    def __init__(self, name, rate, burst, weight=1.0):
+        self.name = name
+        self.weight = weight
+        self.bucket = TokenBucket(rate, burst)
+        self.queue = deque()
+        self.in_flight = 0
+        self.last_active = time.monotonic()
+        self.last_finish = 0.0  # Virtual finish time of the last admitted frame
+        self.submitted = 0
+        self.admitted = 0
+        self.shed = 0
+        self.waits = deque(maxlen=256)
+
+    def stats(self):
+        waits = sorted(self.waits)
+        return {
+            "weight": self.weight,
+            "queued": len(self.queue),
+            "submitted": self.submitted,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "tokens": round(self.bucket.tokens, 2) if self.bucket.rate > 0 else None,
+            "wait_mean": sum(waits) / len(waits) if waits else 0.0,
+            "wait_p95": waits[min(len(waits) - 1, int(0.95 * len(waits)))] if waits else 0.0,
+            "wait_max": waits[-1] if waits else 0.0,
+        }
+
+
+class ModelScheduler:
+    def __init__(self, concurrency=None, key_rate_per_minute=None, session_rate_per_minute=None,
+                 burst=None, max_frame_age=None, late_weight=None, idle_expiry=None):
+        self.concurrency = max(1, concurrency or settings.scheduler_concurrency)
+        self.key_rate = (settings.scheduler_key_rpm if key_rate_per_minute is None else key_rate_per_minute) / 60
+        self.session_rate = (settings.scheduler_session_rpm if session_rate_per_minute is None
+                             else session_rate_per_minute) / 60
+        self.burst = settings.scheduler_burst if burst is None else burst
+        self.max_frame_age = settings.scheduler_max_frame_age if max_frame_age is None else max_frame_age
+        self.late_weight = settings.scheduler_late_weight if late_weight is None else late_weight
+        self.idle_expiry = settings.scheduler_idle_expiry if idle_expiry is None else idle_expiry
+        self.sessions = {}
+        self.keys = {}  # key_id(api_key) -> (bucket, last used)
+        self._expired_at = time.monotonic()
+        self.in_flight = 0
+        self.virtual_time = 0.0
+        self._seq = count()
+        self._cond = threading.Condition()
+
+    def _session(self, name):
+        state = self.sessions.get(name)
+        if state is None:
+            weight = self.late_weight if name.endswith(":late") else 1.0
+            state = self.sessions[name] = SessionState(name, self.session_rate, self.burst, weight)
+        return state
+
+    def _key_bucket(self, key):
+        entry = self.keys.get(key)
+        if entry is None:
+            entry = self.keys[key] = [TokenBucket(self.key_rate, self.burst), time.monotonic()]
+        return entry[0]
+
+    def _expire(self, now):
+        """Forget idle sessions and keys (called with the lock held, at most every minute)"""
+        if self.idle_expiry <= 0 or now - self._expired_at < min(60.0, self.idle_expiry):
+            return
+        self._expired_at = now
+        for name in [name for name, state in self.sessions.items()
+                     if not state.queue and not state.in_flight and now - state.last_active > self.idle_expiry]:
+            del self.sessions[name]
+        for key in [key for key, (_, used) in self.keys.items() if now - used > self.idle_expiry]:
+            del self.keys[key]
+
+    def set_weight(self, session, weight):
+        """Give a session a larger (or smaller) share of the model slots"""
+        with self._cond:
+            self._session(session).weight = max(0.01, weight)
+
+    def run(self, session, fn, api_key="default", captured_at=None, priority=False):
+        """Wait for a slot, then call fn() on this thread and return its result.
+
+        captured_at is when the frame was captured (or received, for remote
+        frames) by this server's wall clock; None = never stale. If the frame
+        is shed, an error result marked "shed" is returned instead.
+        """
+        ticket = self._enqueue(session, key_id(api_key), captured_at, priority)
+        with self._cond:
+            while True:
+                self._dispatch()
+                if ticket.state != WAITING:
+                    break
+                self._cond.wait(self._next_wakeup())
+
+        if ticket.state == SHED:
+            logger.warning("Dropped frame for session %s: %s", session, ticket.reason)
+            return {"status": "error", "alert_level": "ERROR", "message": f"Frame skipped: {ticket.reason}",
+                    "confidence": 0, "shed": True, "retryable": False}
+
+        result = None
+        try:
+            result = fn()
+            return result
+        finally:
+            self._complete(ticket, result)
+
+    def _enqueue(self, session, api_key, captured_at, priority):
+        with self._cond:
+            state = self._session(session)
+            ticket = Ticket(next(self._seq), session, api_key, captured_at, priority)
+            state.queue.append(ticket)
+            state.submitted += 1
+            state.last_active = ticket.enqueued
+            self._cond.notify_all()
+            return ticket
+
+    def record_shed(self, session, count, reason):
+        """Count frames a session dropped before submitting them (e.g. superseded in its backlog)"""
+        with self._cond:
+            state = self._session(session)
+            state.submitted += count
+            state.shed += count
+            state.last_active = time.monotonic()
+        logger.warning("Dropped %d frame(s) for session %s: %s", count, session, reason)
+
+    def _shed(self, state, ticket, reason):
+        ticket.state = SHED
+        ticket.reason = reason
+        state.shed += 1
+
+    def _dispatch(self):
+        """Admit as many waiting frames as slots and buckets allow (called with the lock held)"""
+        now = time.monotonic()
+        wall_now = time.time()
+        changed = False
+        self._expire(now)
+        for state in self.sessions.values():
+            state.bucket.refill(now)
+            # Drop frames that are too old to be worth analyzing
+            while (state.queue and self.max_frame_age > 0 and state.queue[0].captured_at is not None
+                   and wall_now - state.queue[0].captured_at > self.max_frame_age):
+                self._shed(state, state.queue.popleft(), f"stale after {self.max_frame_age:g}s")
+                changed = True
+        for bucket, _ in self.keys.values():
+            bucket.refill(now)
+
+        while self.in_flight < self.concurrency:
+            best, best_rank = None, None
+            for state in self.sessions.values():
+                if not state.queue or not state.bucket.ready():
+                    continue
+                head = state.queue[0]
+                if not self._key_bucket(head.api_key).ready():
+                    continue
+                start = max(self.virtual_time, state.last_finish)
+                rank = (not head.priority, start, head.seq)
+                if best_rank is None or rank < best_rank:
+                    best, best_rank = state, rank
+            if best is None:
+                break
+
+            ticket = best.queue.popleft()
+            start = best_rank[1]
+            self.virtual_time = start
+            best.last_finish = start + 1.0 / best.weight
+            best.bucket.consume()
+            self._key_bucket(ticket.api_key).consume()
+            self.keys[ticket.api_key][1] = now
+            best.in_flight += 1
+            best.admitted += 1
+            best.waits.append(now - ticket.enqueued)
+            ticket.state = ADMITTED
+            self.in_flight += 1
+            changed = True
+        if changed:
+            self._cond.notify_all()
+
+    def _next_wakeup(self):
+        """How long waiters may sleep before a bucket refills or a frame goes stale"""
+        delays = []
+        for state in self.sessions.values():
+            if state.queue:
+                delays.append(state.bucket.wait_time())
+                delays.append(self._key_bucket(state.queue[0].api_key).wait_time())
+        delays = [d for d in delays if d > 0]
+        return min(delays + [1.0])
+
+    def _complete(self, ticket, result):
+        with self._cond:
+            self.in_flight -= 1
+            state = self._session(ticket.session)
+            state.in_flight -= 1
+            state.last_active = time.monotonic()
+            # Charge cascade escalations (extra model calls) to the buckets
+            calls = result.get("model_calls", 1) if isinstance(result, dict) else 1
+            if calls > 1:
+                state.bucket.consume(calls - 1)
+                self._key_bucket(ticket.api_key).consume(calls - 1)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "in_flight": self.in_flight,
+                "concurrency": self.concurrency,
+                "sessions": {name: state.stats() for name, state in self.sessions.items()},
+                "keys": len(self.keys),
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """The process-wide model scheduler"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ModelScheduler()
+    return _scheduler
@@ -0,0 +1,172 @@
+# app/mule/spool.py
+"""Durable spool for frames that couldn't be analyzed because the model was unreachable.
+
+Frames are copied into a directory (so ScreenshotTaker's cleanup can't delete
+them) under a byte budget, evicting the oldest first, and tagged with the
+session that captured them. Once a live analysis succeeds again, the
+Backfiller drains the spool oldest-first through the batch path at a limited
+rate and records the results as late, against their own session.
+"""
+import os
+import json
+import glob
+import shutil
+import threading
+import logging
+from time import time
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class FrameSpool:
+    """Disk-backed FIFO of unanalyzed frames with a byte budget"""
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or settings.spool_dir
+        self.max_bytes = max_bytes if max_bytes is not None else settings.spool_max_bytes
+        self._lock = threading.Lock()
+        self._seq = 0
+        os.makedirs(self.directory, exist_ok=True)
+        # Counted in memory so checking for waiting frames doesn't list the directory
+        self._count = len(self._frames())
+
+    def _frames(self):
+        """Spooled frame paths, oldest first (names sort by capture time)"""
+        return sorted(glob.glob(os.path.join(self.directory, "*.png")))
+
+    @staticmethod
+    def _meta_path(frame_path):
+        return os.path.splitext(frame_path)[0] + ".json"
+
+    def add(self, screenshot_path, timestamp=None, goal=None, session_id=None, interval=None):
+        """Copy a frame into the spool, evicting the oldest frames if over budget"""
+        timestamp = timestamp or time()
+        with self._lock:
+            self._seq += 1
+            name = f"{int(timestamp * 1000):013d}_{self._seq:06d}"
+            frame_path = os.path.join(self.directory, name + ".png")
+            try:
+                shutil.copyfile(screenshot_path, frame_path)
+                with open(self._meta_path(frame_path), "w") as f:
+                    json.dump({"timestamp": timestamp, "goal": goal, "session_id": session_id,
+                               "interval": interval, "source": screenshot_path}, f)
+            except OSError as e:
+                logger.error("Error spooling frame %s: %s", screenshot_path, e)
+                self._remove(frame_path)
+                return None
+            self._count += 1
+            self._evict()
+        logger.info("Spooled frame for later analysis: %s", frame_path)
+        return frame_path
+
+    def _evict(self):
+        frames = self._frames()
+        sizes = {f: os.path.getsize(f) for f in frames}
+        total = sum(sizes.values())
+        while frames and total > self.max_bytes:
+            oldest = frames.pop(0)
+            total -= sizes[oldest]
+            if self._remove(oldest):
+                self._count -= 1
+            logger.warning("Spool over budget, dropped oldest frame: %s", oldest)
+
+    def _remove(self, frame_path):
+        """Delete a frame and its metadata; returns whether the frame was there"""
+        removed = False
+        for path in (frame_path, self._meta_path(frame_path)):
+            try:
+                os.remove(path)
+                removed = removed or path == frame_path
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def peek(self, count):
+        """Return up to count (frame_path, meta) entries, oldest first"""
+        with self._lock:
+            entries = []
+            for frame_path in self._frames()[:count]:
+                try:
+                    with open(self._meta_path(frame_path)) as f:
+                        meta = json.load(f)
+                except (OSError, ValueError):
+                    meta = {"timestamp": int(os.path.basename(frame_path)[:13]) / 1000, "goal": None,
+                            "session_id": None}
+                entries.append((frame_path, meta))
+            return entries
+
+    def remove(self, frame_path):
+        """Drop a frame once it has been analyzed"""
+        with self._lock:
+            if self._remove(frame_path):
+                self._count -= 1
+
+    def __len__(self):
+        return self._count
+
+    def size_bytes(self):
+        with self._lock:
+            return sum(os.path.getsize(f) for f in self._frames())
+
+
+class Backfiller:
+    """Drains the spool through the batch path once the upstream has recovered"""
+
+    def __init__(self, spool, analyze_batch, record_result, rate_per_minute=None, batch_size=None):
+        self.spool = spool
+        self.analyze_batch = analyze_batch
+        self.record_result = record_result
+        self.rate_per_minute = rate_per_minute or settings.backfill_rate_per_minute
+        self.batch_size = batch_size or settings.backfill_batch_size
+        self._recovered = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def upstream_recovered(self):
+        """Signal that a live analysis succeeded, starting a drain if frames are waiting"""
+        if not len(self.spool):
+            return
+        with self._lock:
+            self._recovered.set()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="spool-backfill", daemon=True)
+                self._thread.start()
+
+    def upstream_failed(self):
+        """Signal an outage so draining pauses"""
+        self._recovered.clear()
+
+    def stop(self):
+        self._stopped.set()
+        self._recovered.set()
+
+    def _run(self):
+        pause = 60.0 * self.batch_size / self.rate_per_minute
+        while not self._stopped.is_set():
+            self._recovered.wait()
+            if self._stopped.is_set():
+                return
+            # Checked under the lock upstream_recovered() takes, so a frame spooled
+            # just now either shows up here or gets a new thread
+            with self._lock:
+                entries = self.spool.peek(self.batch_size)
+                if not entries:
+                    self._thread = None
+                    return
+
+            results = self.analyze_batch([(path, meta.get("goal")) for path, meta in entries])
+            for (path, meta), result in zip(entries, results):
+                if result.get("retryable"):
+                    # Still unreachable: keep this and the remaining frames for later
+                    logger.warning("Upstream unavailable again, pausing backfill")
+                    self.upstream_failed()
+                    break
+                result["late"] = True
+                self.record_result(result, path, meta)
+                self.spool.remove(path)
+            logger.info("Backfilled %s spooled frames, %s remaining", len(entries), len(self.spool))
+
+            # Rate limit so reconnecting doesn't burst through the quota
+            self._stopped.wait(pause)
@@ -1,18 +1,31 @@
 import logging
-import os
-import google.generativeai as genai
 from fastapi import BackgroundTasks
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from app.mule.processor import Processor
+from app.mule.scheduler import get_scheduler
+from app.mule.spool import FrameSpool, Backfiller
 from app.core.settings import settings
+from app.utils.image_analysis import create_model
 
 logger = logging.getLogger(__name__)
 
-# Configure the API
-genai.configure(api_key=os.environ.get("API_KEY", settings.api_key))
-
 processor = Processor()
 
+def analyze_backlog(frames: List[Tuple[str, Optional[str]]]):
+    """Analyze a batch of spooled (path, goal) frames"""
+    return processor.analyze_late(frames)
+
+def _record_late_result(result, path, meta):
+    from app.api.endpoints.alerts import record_late_result
+    record_late_result(result, path, meta.get("timestamp"), session_id=meta.get("session_id"),
+                       goal=meta.get("goal"), interval=meta.get("interval"))
+
+# Frames captured while the model is unreachable are kept here and backfilled later,
+# tagged with the session they belong to
+spool = FrameSpool()
+live_session = {"session_id": None, "interval": None}
+backfiller = Backfiller(spool, analyze_backlog, _record_late_result)
+
 def process_screenshots(screenshot_paths: List[str], background_tasks: BackgroundTasks):
     """Process multiple screenshots in the background"""
     for path in screenshot_paths:
@@ -20,7 +33,14 @@ def process_screenshots(screenshot_paths: List[str], background_tasks: Backgroun
 
 def process_screenshot(path: str):
     """Process a single screenshot"""
-    return processor.process_screenshot(path)
+    result = processor.process_screenshot(path)
+    if result.get("retryable"):
+        # Model unreachable: keep the frame instead of losing the tick
+        result["spooled"] = spool.add(path, goal=processor.user_goal, **live_session) is not None
+        backfiller.upstream_failed()
+    elif result.get("status") == "success":
+        backfiller.upstream_recovered()
+    return result
 
 def analyze_screenshots(screenshot_paths: List[str]):
     """Analyze multiple screenshots and return the results"""
@@ -30,9 +50,18 @@ def analyze_screenshots(screenshot_paths: List[str]):
         results.append(result)
     return results
 
-def set_user_goal(goal: str):
+def get_model_stats():
+    """Per-tier call counts and escalation rates of the live analyzer"""
+    return processor.analyzer.get_tier_stats()
+
+def get_scheduler_stats():
+    """Per-session queueing, shedding and wait times of the model scheduler"""
+    return get_scheduler().stats()
+
+def set_user_goal(goal: str, session_id: Optional[str] = None, interval: Optional[int] = None):
     """Set the user's goal for the session"""
     processor.set_user_goal(goal)
+    live_session.update(session_id=session_id, interval=interval)
 
 def get_session_summary(goal, duration_seconds, screenshot_count, distraction_count, focus_percentage):
     """Generate a session summary using the Gemini model"""
@@ -51,8 +80,8 @@ def get_session_summary(goal, duration_seconds, screenshot_count, distraction_co
     duration_str = duration_str.strip() or "0 seconds"
     
     try:
-        # Create Gemini model
-        model = genai.GenerativeModel("gemini-1.5-flash")
+        # Shared Gemini model handle (reuses the session's connection)
+        model = create_model(settings.summary_model)
         
         # Create the prompt for the session summary
         prompt = f"""
@@ -76,7 +105,7 @@ def get_session_summary(goal, duration_seconds, screenshot_count, distraction_co
         Be encouraging but honest about their performance.
         """
         
-        logger.info(f"Requesting session summary from Gemini for goal: {goal}")
+        logger.info("Requesting session summary from Gemini for goal: %s", goal)
         
         # Generate the response
         response = model.generate_content(prompt)
@@ -87,7 +116,7 @@ def get_session_summary(goal, duration_seconds, screenshot_count, distraction_co
         
         # Extract JSON from the response
         response_text = response.text
-        logger.info(f"Received summary response: {response_text[:100]}...")
+        logger.info("Received summary response: %s...", response_text[:100])
         
         # Look for JSON pattern
         json_match = re.search(r'({.*})', response_text, re.DOTALL)
@@ -97,7 +126,7 @@ def get_session_summary(goal, duration_seconds, screenshot_count, distraction_co
                 summary = data.get("summary", "")
                 tips = data.get("tips", [])
                 
-                logger.info(f"Successfully parsed summary: {summary[:50]}...")
+                logger.info("Successfully parsed summary: %s...", summary[:50])
                 return summary, tips
             except json.JSONDecodeError:
                 logger.warning("Failed to parse JSON from model response")
@@ -141,7 +170,7 @@ def get_session_summary(goal, duration_seconds, screenshot_count, distraction_co
         return summary, tips
             
     except Exception as e:
-        logger.error(f"Error generating session summary: {str(e)}")
+        logger.error("Error generating session summary: %s", e)
         return fallback_summary(goal, duration_str, focus_percentage)
 
 def fallback_summary(goal, duration_str, focus_percentage):
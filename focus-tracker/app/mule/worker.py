@@ -0,0 +1,155 @@
+# app/mule/worker.py
+"""Analysis workers for frames uploaded by capture agents.
+
+Workers pull from the shared IngestQueue, so analysis scales out by running
+more of them: threads inside the API process (settings.ingest_workers) and/or
+standalone processes on other machines sharing settings.ingest_dir:
+
+    python -m app.mule.worker --threads 4
+"""
+import argparse
+import logging
+import os
+import threading
+from collections import OrderedDict
+from app.core.logging_config import setup_logging
+from app.core.settings import settings
+from app.mule.ingest import IngestQueue
+from app.mule.processor import Processor
+from app.mule.scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisWorker:
+    def __init__(self, queue=None, batch_size=None, poll_interval=None):
+        self.queue = queue or IngestQueue()
+        self.batch_size = batch_size or settings.ingest_batch_size
+        self.poll_interval = poll_interval or settings.ingest_poll_interval
+        # One processor per agent so each desktop keeps its own alert history,
+        # least recently used first; agents that stop uploading are evicted
+        self.processors = OrderedDict()
+        self.max_processors = settings.ingest_max_agents
+        self._processors_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def _processor(self, agent_id):
+        with self._processors_lock:
+            processor = self.processors.get(agent_id)
+            if processor is None:
+                processor = self.processors[agent_id] = Processor(session_id=f"agent:{agent_id}")
+                while len(self.processors) > self.max_processors:
+                    evicted, _ = self.processors.popitem(last=False)
+                    logger.info("Dropped alert history of idle agent %s", evicted)
+            else:
+                self.processors.move_to_end(agent_id)
+            return processor
+
+    def run_once(self):
+        """Process one batch for every agent we can claim; returns the number of frames handled"""
+        handled = 0
+        for agent_id in self.queue.agents_with_work():
+            token = self.queue.claim(agent_id)
+            if not token:
+                continue
+            try:
+                handled += self.process_agent(agent_id, token)
+            finally:
+                self.queue.release(agent_id, token)
+        return handled
+
+    def process_agent(self, agent_id, token):
+        """Analyze an agent's queued frames in capture order while holding its claim"""
+        processor = self._processor(agent_id)
+        frames = self.queue.pending(agent_id)
+        # A worker that fell behind only analyzes the newest frames; older ones are superseded
+        keep = settings.scheduler_max_queue_per_session
+        skipped = 0
+        if keep > 0 and len(frames) > keep:
+            superseded, frames = frames[:-keep], frames[-keep:]
+            for meta, image_path in superseded:
+                self.queue.write_result(agent_id, {
+                    "status": "error", "alert_level": "ERROR", "message": "Frame skipped: superseded by newer frames",
+                    "confidence": 0, "shed": True, "agent_id": agent_id,
+                    "timestamp": meta.get("timestamp"), "goal": meta.get("goal"),
+                }, latest=False)  # Duplicates that follow still reuse the last real verdict
+                self.queue.complete(meta, image_path)
+            skipped = len(superseded)
+            get_scheduler().record_shed(processor.session_id, skipped, "superseded by newer frames")
+        processed = 0
+        for meta, image_path in frames[:self.batch_size]:
+            processor.set_user_goal(meta.get("goal"))
+
+            if image_path is None:
+                # Agent saw no change since its last frame: reuse the verdict, no model call
+                previous = self.queue.latest_result(agent_id) or {}
+                result = {
+                    "status": previous.get("status", "success"),
+                    "alert_level": previous.get("alert_level", "UNKNOWN"),
+                    "message": previous.get("message", "Screen unchanged"),
+                    "confidence": previous.get("confidence", 0),
+                    "reused": True,
+                }
+                result = processor.record_result(result, None)
+            else:
+                # Staleness is judged on this server's clock, not the agent's
+                result = processor.process_screenshot(image_path, captured_at=meta.get("received_at"))
+
+            result.pop("screenshot_path", None)
+            result.update({
+                "agent_id": agent_id,
+                "timestamp": meta.get("timestamp"),
+                "goal": meta.get("goal"),
+            })
+            self.queue.write_result(agent_id, result)
+            self.queue.complete(meta, image_path)
+            processed += 1
+            if not self.queue.renew(agent_id, token):
+                # Another worker took the claim over after claim_timeout; the rest is its work now
+                logger.warning("Lost claim for agent %s, stopping its batch", agent_id)
+                break
+        return skipped + processed
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                handled = self.run_once()
+            except Exception as e:
+                logger.error("Analysis worker error: %s", e)
+                handled = 0
+            if not handled:
+                self._stopped.wait(self.poll_interval)
+
+    def start(self, threads=1):
+        """Start worker threads"""
+        for i in range(threads):
+            thread = threading.Thread(target=self._run, name=f"analysis-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Started %s analysis worker thread(s) on %s", threads, self.queue.directory)
+
+    def stop(self):
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join(timeout=5.0)
+        self._threads = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run analysis workers for uploaded frames")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--ingest-dir", default=None, help="Shared ingest directory (default: settings)")
+    args = parser.parse_args()
+
+    setup_logging()
+    worker = AnalysisWorker(IngestQueue(args.ingest_dir))
+    worker.start(args.threads)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# app/utils/async_client.py
+"""Async wrappers for the blocking model calls made from API handlers.
+
+The google-generativeai calls used here are synchronous (and key changes
+switch the process-wide active key), so they run on a dedicated,
+bounded thread pool. Handlers await them without blocking the event loop,
+and a burst of validations or summaries can't exhaust the default
+threadpool that FastAPI uses for sync endpoints.
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from app.core.settings import settings
+from app.utils.image_analysis import set_api_key, reset_api_key, get_model_tiers
+from app.utils.model_client import model_clients
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=max(1, settings.model_max_concurrency),
+                               thread_name_prefix="model-call")
+
+
+async def run_model_call(fn, *args, **kwargs):
+    """Run a blocking model call on the model executor and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(fn, *args, **kwargs))
+
+
+async def set_api_key_async(api_key):
+    """Validate and set a custom API key without blocking the event loop"""
+    return await run_model_call(set_api_key, api_key)
+
+
+async def reset_api_key_async():
+    """Reset to the default key; waits for in-flight key validations, so not on the event loop"""
+    return await run_model_call(reset_api_key)
+
+
+async def warm_up_models_async():
+    """Open the model connection for the active key before the first frame is analyzed"""
+    return await run_model_call(model_clients.warm_up, get_model_tiers())
+
+
+async def get_session_summary_async(goal, duration_seconds, screenshot_count, distraction_count, focus_percentage):
+    """Generate a session summary without blocking the event loop"""
+    from app.mule.tasks import get_session_summary
+    return await run_model_call(get_session_summary, goal, duration_seconds, screenshot_count,
+                                distraction_count, focus_percentage)
+
@@ -1,21 +1,90 @@
 # app/utils/image_analysis.py
-import os
 import base64
+import functools
 import json
 import logging
+import threading
 from collections import deque
-import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from app.core.settings import settings
+from app.utils.image_pool import get_image_processor
+from app.utils.model_client import SUPPORTS_SYSTEM_INSTRUCTION, model_clients
 
 logger = logging.getLogger(__name__)
 
-# Store the default API key and track custom key status
-_default_api_key = os.environ.get("API_KEY", settings.api_key)
+# Track custom key status
 _using_custom_key = False
 _custom_key_valid = False
+# The active key is process-wide, so key changes must not interleave
+_key_lock = threading.RLock()
+
+# Errors that mean the model was unreachable rather than that the frame was bad
+RETRYABLE_ERRORS = (
+    ConnectionError,
+    TimeoutError,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    google_exceptions.ResourceExhausted,
+)
+
+# Sampling parameters shared by every frame request
+GENERATION_CONFIG = {
+    "temperature": 0.2,
+    "top_p": 0.95,
+    "top_k": 64,
+    "max_output_tokens": 512,
+}
+
+# Analysis instructions, compiled once per goal by session_instructions()
+ANALYSIS_INSTRUCTIONS = """\
+Analyze this screenshot in relation to the user's stated goal.
+Determine if what's shown in the screenshot aligns with the user's stated goal and porgress is being made towards it.
+
+RESPOND ONLY WITH A JSON OBJECT containing these properties:
+1. "status": (string) MUST be exactly one of "POSITIVE", "CAUTION", or "POTENTIAL_DISTRACTION"
+   - POSITIVE: if the screen content directly supports the user's aim
+   - CAUTION: if the screen content is somewhat related but might lead to distraction
+   - POTENTIAL_DISTRACTION: if the screen content is clearly unrelated to the user's goal
+2. "confidence": (number) A percentage between 0-100 indicating confidence in your assessment
+3. "explanation": (string) A brief explanation of why you gave this status
+
+User's current goal: {goal}
+
+Important: users might need brief moments to switch between relevant applications. Alert when the user is distracted in the last screenshot also try to understand users intention and goal and mark the distraction accordingly. Be strict in marking the distraction. give alerts quickly , so the user can stay away from distractions.
+
+Note: if you see a timer screen in the screenshot ignore that tab completely, it is just the application in which you are running and focus on the other contents of the screen in the provided screenshot.
+
+Your response MUST be valid JSON format.
+"""
+
+# Sent with a frame when the model already has the instructions (system instruction or chat history)
+FRAME_PROMPT = "Next screenshot. Same goal and instructions; respond with the JSON object only."
+
+@functools.lru_cache(maxsize=32)
+def session_instructions(user_goal):
+    """The analysis instructions for a goal, built once per session"""
+    return ANALYSIS_INSTRUCTIONS.format(goal=user_goal or "No specific goal provided")
+
+def is_retryable_error(error):
+    """Check if an analysis error is an upstream outage worth retrying later"""
+    return isinstance(error, RETRYABLE_ERRORS)
+
+def get_model_tiers():
+    """Configured analysis model tiers, cheapest first"""
+    tiers = [name.strip() for name in settings.model_tiers.split(",") if name.strip()]
+    return tiers or ["gemini-1.5-flash"]
+
+def create_model(model_name):
+    """Shared model handle for the active API key (see app.utils.model_client)"""
+    return model_clients.get_model(model_name)
 
 def set_api_key(api_key):
     """Set a custom API key for the Gemini model with validation"""
+    with _key_lock:
+        return _set_api_key(api_key)
+
+def _set_api_key(api_key):
     global _using_custom_key, _custom_key_valid
     
     if not api_key or not api_key.strip():
@@ -26,25 +95,26 @@ def set_api_key(api_key):
     logger.info("Setting custom API key for Gemini")
     
     try:
-        # Try to validate the key with a simple call first
-        genai.configure(api_key=api_key)
-        
-        # Do a simple test call to verify the key works
-        test_model = genai.GenerativeModel("gemini-1.5-flash")
+        # Do a simple test call to verify the key works (this also opens its connection)
+        test_model = model_clients.get_model(get_model_tiers()[0], api_key=api_key)
         test_response = test_model.generate_content("Test validation. Respond with 'OK'.")
         
         if test_response and hasattr(test_response, 'text'):
             logger.info("Custom API key validation successful")
+            model_clients.activate(api_key)
+            model_clients.mark_warm(api_key)
             _using_custom_key = True
             _custom_key_valid = True
             return True
         else:
             logger.warning("Custom API key didn't return expected response")
+            model_clients.release(api_key)
             reset_api_key()
             return False
             
     except Exception as e:
-        logger.error(f"Invalid custom API key: {str(e)}")
+        logger.error("Invalid custom API key: %s", e)
+        model_clients.release(api_key)
         reset_api_key()
         return False
 
@@ -52,9 +122,10 @@ def reset_api_key():
     """Reset to the default API key"""
     global _using_custom_key, _custom_key_valid
     logger.info("Resetting to default API key")
-    genai.configure(api_key=_default_api_key)
-    _using_custom_key = False
-    _custom_key_valid = False
+    with _key_lock:
+        model_clients.activate(None)
+        _using_custom_key = False
+        _custom_key_valid = False
 
 def is_using_custom_key():
     """Check if a custom key is currently being used"""
@@ -96,22 +167,52 @@ class AlertTracker:
         return list(self.statuses)
 
 class GeminiAnalyzer:
-    def __init__(self):
-        # Configure the API
-        genai.configure(api_key=os.environ.get("API_KEY", settings.api_key))
-        # Update to use the currently supported model
-        self.model_name = "gemini-1.5-flash"  # Updated from deprecated gemini-pro-vision
-        self.model = genai.GenerativeModel(self.model_name)
+    def __init__(self, model=None, tiers=None):
+        # Model tiers, cheapest first; frames escalate to the next tier when the verdict is uncertain.
+        # Allow injecting a model (e.g. the local fake model used for replays and benchmarks);
+        # otherwise a tier's model is None and the shared handle for the active key is used.
+        if tiers is None:
+            if model is not None:
+                tiers = [(getattr(model, "model_name", "injected"), model)]
+            else:
+                tiers = [(name, None) for name in get_model_tiers()]
+        self.tiers = tiers
+        self.model_name = tiers[-1][0]
+        self.tier_stats = {name: {"calls": 0, "escalations": 0} for name, _ in tiers}
+        self._last_alert_level = None
         self.chat_history = []
+        # Instructions sent in the kept chat history and how many exchanges ago (later turns only
+        # send FRAME_PROMPT until the instructions scroll out of the history window)
+        self._history_instructions = None
+        self._instructions_age = 0
         # Track the last few analysis results (status only)
         self.recent_statuses = deque(maxlen=3)
-        # Internal counter for logging only - model will track its own counter
+        # Screenshots analyzed this session, reported as ss_no
         self._screenshot_counter = 0
         # Initialize the alert tracker
         self.alert_tracker = AlertTracker()
 
     def analyze_image(self, image_path, user_goal=None):
         """Analyze a screenshot using Google's Gemini API"""
+        raw_result = self.analyze_raw(image_path, user_goal)
+        if raw_result.get("status") != "success":
+            return raw_result
+            
+        # Process the raw result to take into account consecutive distractions
+        return self.process_result_history(raw_result)
+
+    def analyze_raw(self, image_path, user_goal=None, use_history=True, previous_level=None):
+        """Get the model's verdict for a screenshot without applying the alert history.
+
+        The frame goes to the cheapest tier first and only escalates to the
+        next one when the verdict's confidence is below the threshold or it
+        would change the alert level from previous_level. If an escalation
+        fails, the cheaper tier's verdict is kept. With use_history=False the
+        request is sent without (and does not update) the chat history, so
+        several frames can be analyzed concurrently; the analyzer's own last
+        level is then never used or updated, and callers pass previous_level
+        for their session themselves.
+        """
         try:
             # Update internal counter for logging
             self._screenshot_counter += 1
@@ -119,77 +220,112 @@ class GeminiAnalyzer:
             # Load image bytes
             with open(image_path, "rb") as img_file:
                 image_bytes = img_file.read()
-
-            user_text = f"Goal: {user_goal}" if user_goal else "Please analyze this screenshot."
-            
-            # Create the model with safety settings
-            generation_config = {
-                "temperature": 0.2,
-                "top_p": 0.95,
-                "top_k": 64,
-                "max_output_tokens": 512,
-            }
-            
-            # Start a chat session
-            chat = self.model.start_chat(history=self.chat_history)
             
-            # Prepare the prompt with system instructions requesting JSON output
-            prompt = f"""
-            Analyze this screenshot in relation to the user's stated goal.
-            Determine if what's shown in the screenshot aligns with the user's stated goal and porgress is being made towards it.
-            
-            Keep track of which screenshot number this is in the current session - this is an important part of your task.
-            If this is the first screenshot, mark it as 1, then increment the count for each subsequent screenshot.
-            
-            RESPOND ONLY WITH A JSON OBJECT containing these properties:
-            1. "status": (string) MUST be exactly one of "POSITIVE", "CAUTION", or "POTENTIAL_DISTRACTION"
-               - POSITIVE: if the screen content directly supports the user's aim
-               - CAUTION: if the screen content is somewhat related but might lead to distraction
-               - POTENTIAL_DISTRACTION: if the screen content is clearly unrelated to the user's goal
-            2. "confidence": (number) A percentage between 0-100 indicating confidence in your assessment
-            3. "explanation": (string) A brief explanation of why you gave this status
-            4. "ss_no": (number) The current screenshot number in the session sequence (start at 1 for first screenshot)
-            
-            User's current goal: {user_goal if user_goal else "No specific goal provided"}
+            history = self.chat_history if use_history else []
+            if use_history and previous_level is None:
+                previous_level = self._last_alert_level
+            instructions = session_instructions(user_goal)
+            last_tier = len(self.tiers) - 1
+            downscaled = None
+            verdict = None  # (result, history, has_instructions) from the last tier that answered
+            for tier, (model_name, model) in enumerate(self.tiers):
+                # Cheaper tiers can be given a downscaled frame (resized once, off the GIL)
+                data = image_bytes
+                if tier < last_tier and settings.cascade_downscale_width:
+                    if downscaled is None:
+                        downscaled = get_image_processor().downscale(image_path, settings.cascade_downscale_width)
+                    data = downscaled
+                
+                # Shared handles carry the instructions as a system instruction when the SDK allows
+                if model is None:
+                    model = model_clients.get_model(model_name, system_instruction=instructions)
+                    has_instructions = SUPPORTS_SYSTEM_INSTRUCTION
+                else:
+                    has_instructions = False
+                if (history and self._history_instructions == instructions
+                        and self._instructions_age <= settings.analysis_history_turns):
+                    has_instructions = True
+                try:
+                    result, new_history = self._ask_model(model, data,
+                                                          FRAME_PROMPT if has_instructions else instructions, history)
+                except Exception as e:
+                    if verdict is None:
+                        raise
+                    # The cheaper tier already answered, so the frame isn't lost
+                    logger.warning("Escalation to %s failed, keeping the %s verdict: %s",
+                                   model_name, verdict[0]["model"], e)
+                    break
+                result["model"] = model_name
+                result["model_calls"] = tier + 1
+                self.tier_stats[model_name]["calls"] += 1
+                verdict = (result, new_history, has_instructions)
+                
+                if tier == last_tier or not self._should_escalate(result, previous_level):
+                    break
+                self.tier_stats[model_name]["escalations"] += 1
+                logger.info("Escalating screenshot (internal #: %s) from %s (confidence=%s, level=%s)",
+                            self._screenshot_counter, model_name, result.get("confidence"), result.get("alert_level"))
             
-            Important: users might need brief moments to switch between relevant applications. Alert when the user is distracted in the last screenshot also 
-            try to understand users intention and goal and mark the distraction accordingly. Be strict in marking the distraction. give alerts quickly , so the user can stay away from distractions.
+            # Update chat history with the exchange that produced the final verdict
+            result, new_history, has_instructions = verdict
+            if use_history:
+                # Only the last few exchanges are kept, so requests don't grow with the session
+                kept = 2 * settings.analysis_history_turns
+                self.chat_history = new_history[-kept:] if kept > 0 else []
+                if has_instructions:
+                    self._instructions_age += 1
+                else:
+                    self._history_instructions = instructions
+                    self._instructions_age = 1
+                self._last_alert_level = result.get("alert_level")
+            return result
             
-            Note: if you see a timer screen in the screenshot ignore that tab completely, it is just the application in which you are running and focus on the other contents of the screen in the provided screenshot.
+        except Exception as e:
+            logger.error("Error analyzing image (internal #: %s): %s", self._screenshot_counter, e)
+            self.recent_statuses.clear()  # Reset on errors
+            return {"status": "error", "alert_level": "ERROR", "message": str(e), "confidence": 0,
+                    "retryable": is_retryable_error(e)}
 
-            Your response MUST be valid JSON format.
-            """
+    def _should_escalate(self, result, previous_level=None):
+        """Check if a tier's verdict is uncertain enough to ask a stronger model"""
+        try:
+            confidence = float(result.get("confidence") or 0)
+        except (TypeError, ValueError):
+            confidence = 0
+        if confidence < settings.cascade_confidence_threshold:
+            return True
+        # A verdict that changes the alert level is worth confirming
+        return (settings.cascade_escalate_on_change and previous_level is not None
+                and result.get("alert_level") != previous_level)
 
-            # Send the image with the prompt
-            logger.info(f"Sending screenshot (internal #: {self._screenshot_counter}) for analysis")
-            response = chat.send_message(
-                [prompt, {"mime_type": "image/jpeg", "data": base64.b64encode(image_bytes).decode("utf-8")}],
-                generation_config=generation_config
-            )
+    def _ask_model(self, model, image_bytes, prompt, history):
+        """Send one frame to one model; returns the parsed result and the updated chat history"""
+        chat = model.start_chat(history=history)
 
-            # Print first 100 chars of response for debugging
-            response_preview = response.text[:100] + "..." if len(response.text) > 100 else response.text
-            logger.info(f"Received response from model: {response_preview}")
-            
-            # Update chat history
-            self.chat_history = chat.history
-            
-            # Parse the JSON response
-            raw_result = self.parse_json_response(response.text)
-            
-            # Process the raw result to take into account consecutive distractions
-            processed_result = self.process_result_history(raw_result)
-            
-            # Log the model's screenshot number vs our internal counter
-            model_ss_no = processed_result.get("ss_no", "not provided")
-            logger.info(f"Model reports screenshot #{model_ss_no}, internal count is #{self._screenshot_counter}")
-            
-            return processed_result
-            
-        except Exception as e:
-            logger.error(f"Error analyzing image (internal #: {self._screenshot_counter}): {str(e)}")
-            self.recent_statuses.clear()  # Reset on errors
-            return {"status": "error", "alert_level": "ERROR", "message": str(e), "confidence": 0}
+        # Send the image with the prompt
+        logger.debug("Sending screenshot (internal #: %s) for analysis", self._screenshot_counter)
+        response = chat.send_message(
+            [prompt, {"mime_type": "image/jpeg", "data": base64.b64encode(image_bytes).decode("utf-8")}],
+            generation_config=GENERATION_CONFIG
+        )
+
+        # Log the first 100 chars of the response for debugging
+        logger.debug("Received response from model: %.100s", response.text)
+        
+        # Parse the JSON response
+        return self.parse_json_response(response.text), chat.history
+
+    def get_tier_stats(self):
+        """Per-tier call counts and escalation rates"""
+        stats = {}
+        for name, counts in self.tier_stats.items():
+            calls = counts["calls"]
+            stats[name] = {
+                "calls": calls,
+                "escalations": counts["escalations"],
+                "escalation_rate": counts["escalations"] / calls if calls else 0.0,
+            }
+        return stats
 
     def process_result_history(self, result):
         """Process results taking into account consecutive screenshots"""
@@ -211,7 +347,8 @@ class GeminiAnalyzer:
             processed_result["message"] = "Potential distraction detected - continuing to monitor: " + processed_result["message"]
             
         # Log the history for debugging
-        logger.info(f"Recent status history: {self.alert_tracker.get_status_history()}, Current alert: {processed_result['alert_level']}")
+        logger.info("Recent status history: %s, Current alert: %s",
+                    self.alert_tracker.get_status_history(), processed_result["alert_level"])
         
         return processed_result
 
@@ -225,7 +362,7 @@ class GeminiAnalyzer:
             
             if start >= 0 and end >= 0:
                 json_text = response_text[start:end+1]
-                logger.info(f"Extracted JSON: {json_text[:100]}...")
+                logger.debug("Extracted JSON: %.100s", json_text)
                 data = json.loads(json_text)
             else:
                 # Fallback to the original interpretation method
@@ -236,7 +373,8 @@ class GeminiAnalyzer:
             status = data.get("status", "UNKNOWN").upper()
             confidence = data.get("confidence", 0)
             explanation = data.get("explanation", "No explanation provided")
-            ss_no = data.get("ss_no", self._screenshot_counter)  # Use model's number or fallback to internal
+            # Numbered here: the model only sees the last few exchanges, so it can't count the session's frames
+            ss_no = self._screenshot_counter
             
             # Map status to alert_level
             alert_level = "NORMAL"
@@ -245,7 +383,7 @@ class GeminiAnalyzer:
             elif status == "POTENTIAL_DISTRACTION":
                 alert_level = "ALERT"  # We'll downgrade this if it's not consistent
             
-            logger.info(f"Parsed result for model's screenshot #{ss_no}: status={status}, confidence={confidence}")
+            logger.debug("Parsed result for screenshot #%s: status=%s, confidence=%s", ss_no, status, confidence)
             
             return {
                 "status": "success",
@@ -256,7 +394,7 @@ class GeminiAnalyzer:
             }
             
         except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON: {str(e)}")
+            logger.error("Failed to parse JSON: %s", e)
             # Fallback to the original interpretation method
             return self.interpret_results(response_text)
 
@@ -270,7 +408,7 @@ class GeminiAnalyzer:
                 "alert_level": "NORMAL", 
                 "message": "On track", 
                 "confidence": 50,
-                "ss_no": self._screenshot_counter  # Use internal counter as fallback
+                "ss_no": self._screenshot_counter
             }
         elif "CAUTION" in response_text:
             return {
@@ -302,5 +440,8 @@ class GeminiAnalyzer:
         self.recent_statuses.clear()
         self._screenshot_counter = 0
         self.chat_history = []  # Important: Also reset the chat history to start fresh
+        self._history_instructions = None
+        self._instructions_age = 0
+        self._last_alert_level = None
         reset_api_key()  # Reset to the default API key
         logger.info("Reset analyzer history, screenshot counter, and API key")
\ No newline at end of file
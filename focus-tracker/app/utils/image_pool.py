@@ -0,0 +1,174 @@
+# app/utils/image_pool.py
+"""CPU-bound frame work (PNG encoding, resizing, thumbnails) in a process pool.
+
+Encoding a full-screen PNG or resizing a frame holds the GIL for tens of
+milliseconds, which the API's event loop in the same process feels as
+latency spikes. ImageProcessor runs that work in worker processes instead:
+raw pixels are copied once into a reusable shared-memory segment and only
+its name is sent to the worker, so megabyte frames are never pickled, and
+resizing works from the saved file path. The calling thread just waits on
+the result, so the GIL stays free for the event loop.
+
+With IMAGE_WORKERS=0 everything runs in-process, as before.
+"""
+import atexit
+import hashlib
+import io
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from PIL import Image
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Consecutive worker pool failures after which we stop respawning it
+MAX_POOL_FAILURES = 3
+
+
+def encode_frame(segment_name, mode, size, path, format="PNG"):
+    """Worker: save raw pixels from a shared-memory segment as an image file"""
+    # Spawned workers share the parent's resource tracker, which owns the segment
+    segment = shared_memory.SharedMemory(name=segment_name)
+    try:
+        length = len(mode) * size[0] * size[1]
+        image = Image.frombuffer(mode, size, segment.buf[:length], "raw", mode, 0, 1)
+        image.save(path, format=format)
+        # Drop the image before closing: it holds an export of the segment's buffer
+        del image
+    finally:
+        segment.close()
+    return path
+
+
+def downscale_file(path, max_width, quality=80):
+    """Worker: re-encode an image file as JPEG no wider than max_width"""
+    with Image.open(path) as image:
+        image = image.convert("RGB")
+        if image.width > max_width:
+            image = image.resize((max_width, round(image.height * max_width / image.width)), Image.BILINEAR)
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def thumbnail_file(path, width, quality):
+    """Worker: (content hash, WebP bytes) of a small thumbnail of an image file"""
+    with Image.open(path) as image:
+        image = image.convert("RGB")
+        if image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        # Hash the thumbnail's pixels, so identical screens map to the same entry
+        digest = hashlib.sha256(image.tobytes()).hexdigest()[:32]
+        buffer = io.BytesIO()
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+    return digest, buffer.getvalue()
+
+
+class ImageProcessor:
+    """Runs frame encoding and resizing in worker processes"""
+
+    def __init__(self, workers=None):
+        self.workers = settings.image_workers if workers is None else workers
+        self._pool = None
+        self._failures = 0
+        self._lock = threading.Lock()
+        # Reusable shared-memory segments, keyed by size (frames are usually all the same size)
+        self._free_segments = {}
+        self._segments = []
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None and self.workers > 0 and self._failures < MAX_POOL_FAILURES:
+                # Spawn rather than fork: the API process has threads and gRPC channels
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def _run(self, fn, *args):
+        """Run fn in the pool, falling back to this process if the pool is unavailable"""
+        pool = self._get_pool()
+        if pool is None:
+            return fn(*args)
+        try:
+            result = pool.submit(fn, *args).result()
+            self._failures = 0
+            return result
+        except BrokenProcessPool:
+            with self._lock:
+                self._pool = None
+                self._failures += 1
+                failures = self._failures
+            if failures >= MAX_POOL_FAILURES:
+                logger.error("Image worker pool keeps dying, processing frames in-process from now on")
+            else:
+                logger.error("Image worker pool died, restarting it")
+            return fn(*args)
+
+    def _acquire_segment(self, size):
+        with self._lock:
+            free = self._free_segments.get(size)
+            if free:
+                return free.pop()
+        segment = shared_memory.SharedMemory(create=True, size=size)
+        with self._lock:
+            self._segments.append(segment)
+        return segment
+
+    def _release_segment(self, segment, size):
+        # Pooled by the requested size: segment.size can be rounded up to a page (macOS)
+        with self._lock:
+            self._free_segments.setdefault(size, []).append(segment)
+
+    def save(self, image, path, format="PNG"):
+        """Save a captured frame, encoding it in a worker process"""
+        if self._get_pool() is None:
+            image.save(path, format=format)
+            return path
+        if image.mode not in ("RGB", "RGBA", "L"):
+            image = image.convert("RGB")
+        raw = image.tobytes()
+        segment = self._acquire_segment(len(raw))
+        try:
+            segment.buf[:len(raw)] = raw
+            return self._run(encode_frame, segment.name, image.mode, image.size, path, format)
+        finally:
+            self._release_segment(segment, len(raw))
+
+    def downscale(self, path, max_width):
+        """JPEG of a saved frame no wider than max_width, resized in a worker process"""
+        return self._run(downscale_file, path, max_width)
+
+    def thumbnail(self, path, width, quality):
+        """(content hash, WebP bytes) of a thumbnail of a saved frame, made in a worker process"""
+        return self._run(thumbnail_file, path, width, quality)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            segments, self._segments, self._free_segments = self._segments, [], {}
+        if pool is not None:
+            pool.shutdown(wait=True)
+        for segment in segments:
+            segment.close()
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+
+
+_processor = None
+_processor_lock = threading.Lock()
+
+
+def get_image_processor():
+    """The process-wide image processor (its pool starts on first use)"""
+    global _processor
+    with _processor_lock:
+        if _processor is None:
+            _processor = ImageProcessor()
+            atexit.register(_processor.shutdown)
+    return _processor
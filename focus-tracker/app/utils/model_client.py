@@ -0,0 +1,141 @@
+# app/utils/model_client.py
+"""Shared model clients, one connection pool per API key.
+
+genai.configure swaps a process-wide client manager and throws away its
+channels, and every GenerativeModel binds to whatever client is the default
+when it first makes a call. Instead, this factory keeps one
+GenerativeServiceClient (a persistent, keep-alive gRPC channel) per API key
+and hands out cached model handles bound to it. The analyzer, key validation
+and session summaries all go through it, so connection and TLS setup is
+paid once per key, ideally during warm_up() at session start, and never
+inside a frame's analysis latency.
+"""
+import inspect
+import logging
+import os
+import threading
+from collections import OrderedDict
+import google.ai.generativelanguage as glm
+import google.generativeai as genai
+from google.api_core import client_options as api_client_options, gapic_v1
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+WARM_UP_TIMEOUT = 5.0  # seconds
+
+# Model handles kept across keys, tiers and goals (each goal's instructions make a new handle)
+MAX_MODEL_HANDLES = 32
+
+# Newer SDKs take the session's instructions once per model handle instead of in every request
+SUPPORTS_SYSTEM_INSTRUCTION = "system_instruction" in inspect.signature(genai.GenerativeModel.__init__).parameters
+
+
+class ModelClientFactory:
+    def __init__(self, default_api_key):
+        self.default_api_key = default_api_key
+        # Custom key in use for the current session, if any
+        self.active_api_key = None
+        self._clients = {}  # api_key -> GenerativeServiceClient
+        self._models = OrderedDict()  # (api_key, model_name, system_instruction) -> model handle, LRU first
+        self._warm = set()
+        self._lock = threading.RLock()
+
+    @property
+    def api_key(self):
+        return self.active_api_key or self.default_api_key
+
+    def _client(self, api_key):
+        """The API client (and its connection pool) for a key, created once"""
+        client = self._clients.get(api_key)
+        if client is None:
+            client = glm.GenerativeServiceClient(
+                client_options=api_client_options.ClientOptions(api_key=api_key),
+                client_info=gapic_v1.client_info.ClientInfo(user_agent="focus-tracker"),
+            )
+            self._clients[api_key] = client
+        return client
+
+    def get_model(self, model_name, api_key=None, system_instruction=None):
+        """Cached model handle for the given (or currently active) API key.
+
+        A system_instruction is only bound when the SDK supports it; callers
+        check SUPPORTS_SYSTEM_INSTRUCTION and send it in-band otherwise.
+        """
+        api_key = api_key or self.api_key
+        if not SUPPORTS_SYSTEM_INSTRUCTION:
+            system_instruction = None
+        key = (api_key, model_name, system_instruction)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+            else:
+                if settings.model_backend == "fake":
+                    from app.utils.fake_model import FakeGenerativeModel
+                    model = FakeGenerativeModel(model_name, latency=settings.fake_model_latency,
+                                                system_instruction=system_instruction)
+                else:
+                    if system_instruction:
+                        model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+                    else:
+                        model = genai.GenerativeModel(model_name)
+                    # Bind to this key's client instead of the process-wide default
+                    model._client = self._client(api_key)
+                self._models[key] = model
+                # Handles are cheap to rebuild; the key's client (connection pool) is kept
+                while len(self._models) > MAX_MODEL_HANDLES:
+                    self._models.popitem(last=False)
+        return model
+
+    def warm_up(self, model_names, api_key=None):
+        """Open the connection for a key with a cheap token-count call"""
+        api_key = api_key or self.api_key
+        if api_key in self._warm:
+            return
+        try:
+            model = self.get_model(model_names[0], api_key)
+            if settings.model_backend == "fake":
+                model.count_tokens("warm-up")
+            else:
+                # Call the client directly so a slow network can't hold up session start for long
+                self._client(api_key).count_tokens(
+                    model=model.model_name,
+                    contents=[glm.Content(parts=[glm.Part(text="warm-up")])],
+                    timeout=WARM_UP_TIMEOUT,
+                )
+            self._warm.add(api_key)
+            logger.info("Model connection warmed up")
+        except Exception as e:
+            # Not fatal: the first frame will open the connection instead
+            logger.warning("Model connection warm-up failed: %s", e)
+
+    def mark_warm(self, api_key):
+        """Record that a real call already opened the connection for a key"""
+        self._warm.add(api_key)
+
+    def activate(self, api_key=None):
+        """Switch the session to a custom key (None = default) and drop the previous custom key's pool"""
+        with self._lock:
+            previous = self.active_api_key
+            self.active_api_key = api_key
+            if previous and previous != api_key:
+                self.release(previous)
+
+    def release(self, api_key):
+        """Close a key's connection pool and forget its model handles"""
+        with self._lock:
+            if api_key == self.default_api_key:
+                return
+            for key in [k for k in self._models if k[0] == api_key]:
+                del self._models[key]
+            self._warm.discard(api_key)
+            client = self._clients.pop(api_key, None)
+        if client is not None:
+            try:
+                client.transport.close()
+            except Exception as e:
+                logger.warning("Error closing model client: %s", e)
+
+
+model_clients = ModelClientFactory(os.environ.get("API_KEY", settings.api_key))
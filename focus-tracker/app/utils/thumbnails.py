@@ -0,0 +1,130 @@
+# app/utils/thumbnails.py
+"""Content-addressed WebP thumbnails kept as alert evidence.
+
+ScreenshotTaker only keeps the last few full frames, so alerts can't point at
+them for long. Each alert instead links a small WebP thumbnail stored under
+the hash of its pixels: repeated identical screens are stored once, and
+since the content behind a hash never changes, it can be cached forever.
+The store has a total size budget and evicts the least recently used
+thumbnails when it is exceeded.
+"""
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from app.core.settings import settings
+from app.utils.image_pool import get_image_processor
+
+logger = logging.getLogger(__name__)
+
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ThumbnailStore:
+    def __init__(self, directory=None, max_bytes=None, width=None, quality=None):
+        self.directory = directory or settings.thumbnail_dir
+        self.max_bytes = max_bytes or settings.thumbnail_max_bytes
+        self.width = width or settings.thumbnail_width
+        self.quality = quality or settings.thumbnail_quality
+        # digest -> size in bytes, least recently used first
+        self._entries = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._load()
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest[:2], f"{digest}.webp")
+
+    def _load(self):
+        """Index thumbnails left by earlier runs, oldest access first"""
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                digest = name[:-len(".webp")]
+                if name.endswith(".webp") and DIGEST_PATTERN.match(digest):
+                    stat = os.stat(os.path.join(root, name))
+                    found.append((stat.st_mtime, digest, stat.st_size))
+        for _, digest, size in sorted(found):
+            self._entries[digest] = size
+            self._total += size
+
+    def add(self, image_path):
+        """Store a thumbnail of an image file; returns its digest, or None on failure"""
+        try:
+            digest, data = get_image_processor().thumbnail(image_path, self.width, self.quality)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not create thumbnail for %s: %s", image_path, e)
+            return None
+
+        with self._lock:
+            if digest in self._entries:
+                self._touch(digest)
+                return digest
+            path = self._path(digest)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            self._entries[digest] = len(data)
+            self._total += len(data)
+            self._evict()
+        return digest
+
+    def get(self, digest):
+        """Thumbnail bytes for a digest, or None if unknown or evicted"""
+        if not DIGEST_PATTERN.match(digest):
+            return None
+        with self._lock:
+            if digest not in self._entries:
+                return None
+            self._touch(digest)
+        try:
+            with open(self._path(digest), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self._total -= self._entries.pop(digest, 0)
+            return None
+
+    def _touch(self, digest):
+        """Mark a thumbnail as recently used (mtime persists the order across restarts)"""
+        self._entries.move_to_end(digest)
+        try:
+            os.utime(self._path(digest))
+        except OSError:
+            pass
+
+    def _evict(self):
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            digest, size = self._entries.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(self._path(digest))
+            except FileNotFoundError:
+                pass
+
+    def size_bytes(self):
+        return self._total
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_thumbnail_store():
+    """The process-wide thumbnail store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ThumbnailStore()
+    return _store
+
+
+def thumbnail_url(digest):
+    return f"/api/thumbnails/{digest}.webp"
@@ -0,0 +1,165 @@
+# app/utils/timeline.py
+import sys
+import numpy as np
+
+# Alert level codes stored in the timeline
+LEVEL_CODES = {"NORMAL": 0, "CAUTION": 1, "ALERT": 2, "UNKNOWN": 3, "ERROR": 4}
+LEVEL_NAMES = {code: name for name, code in LEVEL_CODES.items()}
+DISTRACTION_CODES = (LEVEL_CODES["CAUTION"], LEVEL_CODES["ALERT"])
+
+# Bit flags stored per tick
+FLAG_REUSED = 1  # Verdict reused from a previous frame instead of a model call
+FLAG_LOCAL = 2  # Verdict decided locally without the model
+FLAG_LATE = 4  # Analyzed after the fact (e.g. backfilled after an outage)
+
+
+def _runs(mask):
+    """Return (starts, ends) index arrays of consecutive True runs; ends are exclusive"""
+    padded = np.concatenate(([0], mask.astype(np.int8), [0]))
+    edges = np.diff(padded)
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+class SessionTimeline:
+    """Compact, array-backed record of a session's analysis results.
+
+    Each tick takes a fixed ~18 bytes in NumPy columns (timestamp, level code,
+    confidence, flags, message id); the model's explanations are almost always
+    unique, so message strings are simply kept out of line in arrival order.
+    Aggregations are vectorized over the columns, which are kept in timestamp
+    order even when late results arrive.
+    """
+
+    def __init__(self, capacity=256):
+        self._size = 0
+        self._timestamps = np.empty(capacity, dtype=np.float64)
+        self._levels = np.empty(capacity, dtype=np.int8)
+        self._confidences = np.empty(capacity, dtype=np.float32)
+        self._flags = np.empty(capacity, dtype=np.uint8)
+        self._message_ids = np.empty(capacity, dtype=np.int32)
+        self._messages = []
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self):
+        """Double the capacity of every column"""
+        capacity = len(self._timestamps) * 2
+        for name in ("_timestamps", "_levels", "_confidences", "_flags", "_message_ids"):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+
+    def append(self, result, timestamp):
+        """Record an analysis result dict captured at the given epoch timestamp"""
+        if self._size == len(self._timestamps):
+            self._grow()
+
+        flags = 0
+        if result.get("reused"):
+            flags |= FLAG_REUSED
+        if result.get("local"):
+            flags |= FLAG_LOCAL
+        if result.get("late"):
+            flags |= FLAG_LATE
+
+        i = self._size
+        if i and timestamp < self._timestamps[i - 1]:
+            # Late result: shift newer ticks right to keep the columns sorted
+            i = int(np.searchsorted(self._timestamps[:self._size], timestamp, side="right"))
+            for name in ("_timestamps", "_levels", "_confidences", "_flags", "_message_ids"):
+                column = getattr(self, name)
+                column[i + 1:self._size + 1] = column[i:self._size]
+        self._timestamps[i] = timestamp
+        self._levels[i] = LEVEL_CODES.get(result.get("alert_level"), LEVEL_CODES["UNKNOWN"])
+        self._confidences[i] = result.get("confidence") or 0
+        self._flags[i] = flags
+        self._message_ids[i] = len(self._messages)
+        self._messages.append(result.get("message", ""))
+        self._size += 1
+
+    # Column views (no copies)
+    @property
+    def timestamps(self):
+        return self._timestamps[:self._size]
+
+    @property
+    def levels(self):
+        return self._levels[:self._size]
+
+    @property
+    def confidences(self):
+        return self._confidences[:self._size]
+
+    @property
+    def flags(self):
+        return self._flags[:self._size]
+
+    def row(self, i):
+        """Materialize a single tick as a dict"""
+        if i < 0:
+            i += self._size
+        if not 0 <= i < self._size:
+            raise IndexError("timeline index out of range")
+        return {
+            "timestamp": float(self._timestamps[i]),
+            "alert_level": LEVEL_NAMES[int(self._levels[i])],
+            "confidence": float(self._confidences[i]),
+            "reused": bool(self._flags[i] & FLAG_REUSED),
+            "local": bool(self._flags[i] & FLAG_LOCAL),
+            "late": bool(self._flags[i] & FLAG_LATE),
+            "message": self._messages[self._message_ids[i]],
+        }
+
+    def distraction_mask(self):
+        levels = self.levels
+        return (levels == DISTRACTION_CODES[0]) | (levels == DISTRACTION_CODES[1])
+
+    def distraction_count(self):
+        return int(np.count_nonzero(self.distraction_mask()))
+
+    def focus_percentage(self):
+        if not self._size:
+            return 100.0
+        return (self._size - self.distraction_count()) / self._size * 100
+
+    def distraction_episodes(self):
+        """Return (start_timestamps, durations, refocus_times) for each run of distracted ticks.
+
+        Durations span the first to the last distracted tick; refocus times run to
+        the next focused tick and are NaN for an episode still open at the end.
+        """
+        starts, ends = _runs(self.distraction_mask())
+        timestamps = self.timestamps
+        durations = timestamps[ends - 1] - timestamps[starts]
+        refocus = np.full(len(starts), np.nan)
+        closed = ends < self._size
+        refocus[closed] = timestamps[ends[closed]] - timestamps[starts[closed]]
+        return timestamps[starts], durations, refocus
+
+    def longest_focus_streak(self):
+        """Length (in ticks) of the longest run without a distraction"""
+        starts, ends = _runs(~self.distraction_mask())
+        return int((ends - starts).max()) if len(starts) else 0
+
+    def summary(self):
+        """Aggregate stats for the session"""
+        _, durations, refocus = self.distraction_episodes()
+        closed = refocus[~np.isnan(refocus)]
+        return {
+            "screenshot_count": self._size,
+            "distraction_count": self.distraction_count(),
+            "focus_percentage": self.focus_percentage(),
+            "alert_count": int(np.count_nonzero(self.levels == LEVEL_CODES["ALERT"])),
+            "distraction_episodes": len(durations),
+            "longest_focus_streak": self.longest_focus_streak(),
+            "mean_time_to_refocus": float(closed.mean()) if len(closed) else 0.0,
+            "mean_confidence": float(self.confidences.mean()) if self._size else 0.0,
+        }
+
+    def nbytes(self):
+        """Approximate memory used by the columns and the message strings"""
+        columns = sum(getattr(self, name).nbytes for name in
+                      ("_timestamps", "_levels", "_confidences", "_flags", "_message_ids"))
+        return columns + sys.getsizeof(self._messages) + sum(sys.getsizeof(m) for m in self._messages)
@@ -0,0 +1,135 @@
+# app/watcher/agent.py
+"""Standalone capture agent for split deployments.
+
+Runs on the user's desktop without the API or model client: captures frames
+with a capture backend, skips frames that haven't visibly changed, encodes the
+rest as downscaled JPEG and uploads them over a keep-alive HTTP connection to
+a central server's /api/ingest/frames endpoint for analysis.
+
+Usage:
+    python -m app.watcher.agent --server http://analysis.example:8000 --goal "Write the report"
+"""
+import argparse
+import io
+import logging
+import socket
+import threading
+from time import time
+import httpx
+import numpy as np
+from PIL import Image
+from app.core.logging_config import setup_logging
+from app.core.settings import settings
+from app.watcher.backends import get_capture_backend
+
+logger = logging.getLogger(__name__)
+
+
+class CaptureAgent:
+    def __init__(self, server_url, agent_id=None, goal=None, interval=None, backend=None, token=None):
+        self.agent_id = agent_id or socket.gethostname()
+        self.goal = goal
+        self.interval = interval or settings.screenshot_interval
+        self.backend = backend or get_capture_backend()
+        headers = {"X-Agent-Token": token} if token else {}
+        # One persistent connection, reused for every upload
+        self.client = httpx.Client(
+            base_url=server_url,
+            headers=headers,
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=1, max_keepalive_connections=1, keepalive_expiry=300),
+        )
+        self._previous = None
+        self._last_level = None
+        self._stopped = threading.Event()
+
+    def fingerprint(self, image):
+        """Tiny grayscale version of a frame used to detect unchanged screens"""
+        return np.asarray(image.convert("L").resize((64, 36), Image.BILINEAR), dtype=np.int16)
+
+    def is_duplicate(self, fingerprint):
+        if self._previous is None:
+            return False
+        return float(np.abs(fingerprint - self._previous).mean()) < settings.agent_dedup_threshold
+
+    def encode(self, image):
+        """Downscale and JPEG-encode a frame for upload"""
+        if image.width > settings.agent_max_width:
+            height = round(image.height * settings.agent_max_width / image.width)
+            image = image.resize((settings.agent_max_width, height), Image.BILINEAR)
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=settings.agent_jpeg_quality, optimize=True)
+        return buffer.getvalue()
+
+    def tick(self):
+        """Capture and upload one frame; returns the server response"""
+        image = self.backend.grab()
+        timestamp = time()
+        fingerprint = self.fingerprint(image)
+
+        data = {"agent_id": self.agent_id, "timestamp": str(timestamp)}
+        if self.goal:
+            data["goal"] = self.goal
+        files = None
+        if self.is_duplicate(fingerprint):
+            data["duplicate"] = "true"
+        else:
+            files = {"frame": ("frame.jpg", self.encode(image), "image/jpeg")}
+            self._previous = fingerprint
+
+        response = self.client.post("/api/ingest/frames", data=data, files=files)
+        response.raise_for_status()
+        body = response.json()
+        self._report(body.get("latest_result"))
+        return body
+
+    def _report(self, result):
+        """Log verdict changes so the user sees alerts from the central server"""
+        if not result:
+            return
+        level = result.get("alert_level")
+        if level != self._last_level and level in ("CAUTION", "ALERT"):
+            logger.warning("%s: %s", level, result.get("message"))
+        self._last_level = level
+
+    def run(self):
+        logger.info("Capture agent %s uploading every %ss to %s", self.agent_id, self.interval, self.client.base_url)
+        while not self._stopped.is_set():
+            started = time()
+            try:
+                self.tick()
+            except (httpx.HTTPError, OSError) as e:
+                logger.error("Upload failed: %s", e)
+            self._stopped.wait(max(0.0, self.interval - (time() - started)))
+
+    def stop(self):
+        self._stopped.set()
+
+    def close(self):
+        self.client.close()
+        self.backend.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Capture frames and upload them to a Focus Tracker server")
+    parser.add_argument("--server", required=True, help="Base URL of the analysis server")
+    parser.add_argument("--agent-id", default=None, help="Identifier of this desktop (default: hostname)")
+    parser.add_argument("--goal", default=None)
+    parser.add_argument("--interval", type=float, default=None, help="Seconds between frames")
+    parser.add_argument("--backend", default=None, help="Capture backend (default: settings)")
+    parser.add_argument("--token", default=None, help="Shared ingest token, if the server requires one")
+    args = parser.parse_args()
+
+    setup_logging()
+    agent = CaptureAgent(args.server, args.agent_id, args.goal, args.interval,
+                         get_capture_backend(args.backend), args.token)
+    try:
+        agent.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        agent.close()
+
+
+if __name__ == "__main__":
+    main()
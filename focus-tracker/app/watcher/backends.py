@@ -0,0 +1,156 @@
+import os
+import glob
+import threading
+import logging
+from itertools import cycle
+from PIL import Image
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CaptureBackend:
+    """Base class for screen capture backends"""
+
+    name = "base"
+
+    def grab(self) -> Image.Image:
+        """Capture a single frame and return it as an RGB PIL image"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the backend"""
+        pass
+
+
+class PyAutoGUIBackend(CaptureBackend):
+    """Full-desktop capture through pyautogui (portable but slow on Linux)"""
+
+    name = "pyautogui"
+
+    def __init__(self, region=None):
+        # Imported lazily so headless environments can use the other backends
+        import pyautogui
+        self._pyautogui = pyautogui
+        self.region = region
+
+    def grab(self) -> Image.Image:
+        return self._pyautogui.screenshot(region=self.region)
+
+
+class X11Backend(CaptureBackend):
+    """Fast X11 capture through mss, using MIT-SHM shared memory when the server supports it.
+
+    Can target a single monitor (1-based, 0 means all monitors combined) or an
+    explicit (left, top, width, height) region. Works under Xvfb.
+    """
+
+    name = "x11"
+
+    def __init__(self, monitor=1, region=None, display=None):
+        import mss
+        self._mss = mss
+        self.monitor = monitor
+        self.region = region
+        self.display = display
+        # mss keeps an X connection per instance, which must not be shared across threads
+        self._local = threading.local()
+
+    def _get_sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            kwargs = {"display": self.display} if self.display else {}
+            sct = self._mss.mss(**kwargs)
+            self._local.sct = sct
+        return sct
+
+    def _get_area(self, sct):
+        if self.region:
+            left, top, width, height = self.region
+            return {"left": left, "top": top, "width": width, "height": height}
+        if self.monitor >= len(sct.monitors):
+            logger.warning("Monitor %s not found, capturing all monitors", self.monitor)
+            return sct.monitors[0]
+        return sct.monitors[self.monitor]
+
+    def grab(self) -> Image.Image:
+        sct = self._get_sct()
+        shot = sct.grab(self._get_area(sct))
+        return Image.frombytes("RGB", shot.size, shot.bgra, "raw", "BGRX")
+
+    def close(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
+
+
+class SyntheticBackend(CaptureBackend):
+    """Frame source that needs no display.
+
+    Replays the images in ``source_dir`` in filename order (looping), or
+    generates plain colored frames when no directory is given.
+    """
+
+    name = "synthetic"
+
+    COLORS = [(30, 30, 30), (240, 240, 240), (40, 90, 160), (200, 60, 60)]
+
+    def __init__(self, source_dir=None, size=(1280, 720), loop=True):
+        self.size = size
+        self.loop = loop
+        self.frames = []
+        if source_dir:
+            patterns = ("*.png", "*.jpg", "*.jpeg", "*.webp")
+            for pattern in patterns:
+                self.frames.extend(glob.glob(os.path.join(source_dir, pattern)))
+            self.frames.sort()
+            if not self.frames:
+                raise ValueError(f"No images found in {source_dir}")
+        self._iter = cycle(self.frames) if loop else iter(self.frames)
+        self._colors = cycle(self.COLORS)
+
+    def grab(self) -> Image.Image:
+        if not self.frames:
+            return Image.new("RGB", self.size, next(self._colors))
+        try:
+            path = next(self._iter)
+        except StopIteration:
+            raise EOFError("Synthetic source exhausted")
+        with Image.open(path) as img:
+            return img.convert("RGB")
+
+
+BACKENDS = {
+    PyAutoGUIBackend.name: PyAutoGUIBackend,
+    X11Backend.name: X11Backend,
+    SyntheticBackend.name: SyntheticBackend,
+}
+
+
+def parse_region(value):
+    """Parse a "left,top,width,height" string into a tuple (or None if empty)"""
+    if not value:
+        return None
+    parts = [int(p) for p in value.split(",")]
+    if len(parts) != 4:
+        raise ValueError(f"Invalid capture region: {value}")
+    return tuple(parts)
+
+
+def get_capture_backend(name=None, **kwargs):
+    """Create a capture backend by name, defaulting to the configured one"""
+    name = (name or settings.capture_backend).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown capture backend: {name}")
+
+    if name == X11Backend.name:
+        kwargs.setdefault("monitor", settings.capture_monitor)
+        kwargs.setdefault("region", parse_region(settings.capture_region))
+    elif name == PyAutoGUIBackend.name:
+        kwargs.setdefault("region", parse_region(settings.capture_region))
+    elif name == SyntheticBackend.name:
+        kwargs.setdefault("source_dir", settings.synthetic_source_dir or None)
+
+    logger.info("Using capture backend: %s", name)
+    return BACKENDS[name](**kwargs)
@@ -0,0 +1,167 @@
+# app/watcher/idle.py
+"""Detects when the user is away, from cheap local signals.
+
+The monitor asks the detector before saving and analyzing a frame. The user
+counts as idle once neither the pointer position nor the screen contents
+have changed for idle_timeout seconds, or right away while the screen is
+locked (reported by the OS) or blank (a lock screen, screensaver or display
+power-off looks like a near-uniform frame). While idle, the monitor polls
+the pointer and lock state, which need no capture, and resumes as soon as
+either changes.
+
+Every signal degrades gracefully: without a display, pyautogui or an OS lock
+API, the detector falls back to comparing frames.
+"""
+import ctypes
+import logging
+import os
+import subprocess
+import sys
+from time import monotonic
+import numpy as np
+from PIL import Image
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Frames whose grayscale fingerprint varies less than this look blank
+BLANK_FRAME_STDDEV = 2.0
+
+
+def _pointer_reader():
+    """Callable returning the pointer position, or None if it can't be read here"""
+    try:
+        import pyautogui
+        pyautogui.position()
+    except Exception as e:  # No display, no pyautogui, Wayland...
+        logger.info("Pointer position unavailable for idle detection: %s", e)
+        return None
+    return pyautogui.position
+
+
+def _lock_reader():
+    """Callable returning whether the session is locked, or None if the OS doesn't tell us"""
+    if sys.platform == "win32":
+        user32 = ctypes.windll.user32
+        desktop_switch = 0x0100
+
+        def windows_locked():
+            # The input desktop can't be opened while the lock screen owns it
+            desktop = user32.OpenInputDesktop(0, False, desktop_switch)
+            if not desktop:
+                return True
+            user32.CloseDesktop(desktop)
+            return False
+        return windows_locked
+
+    if sys.platform == "darwin":
+        try:
+            from Quartz import CGSessionCopyCurrentDictionary
+        except ImportError:
+            return None
+        return lambda: bool((CGSessionCopyCurrentDictionary() or {}).get("CGSSessionScreenIsLocked"))
+
+    # systemd-logind sessions expose a LockedHint set by most screen lockers
+    command = ["loginctl", "show-session", os.environ.get("XDG_SESSION_ID", "self"), "-p", "LockedHint", "--value"]
+    try:
+        probe = subprocess.run(command, capture_output=True, text=True, timeout=2)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if probe.returncode != 0 or probe.stdout.strip() not in ("yes", "no"):
+        return None
+
+    def logind_locked():
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+        return result.stdout.strip() == "yes"
+    return logind_locked
+
+
+class IdleDetector:
+    def __init__(self, timeout=None, frame_threshold=None, pointer=None, lock=None):
+        self.timeout = settings.idle_timeout if timeout is None else timeout
+        self.frame_threshold = (settings.idle_frame_change_threshold if frame_threshold is None
+                                else frame_threshold)
+        # Signal readers are probed on first use; pass False to disable one
+        self._pointer = pointer
+        self._lock = lock
+        self._probed = False
+        self.last_activity = monotonic()
+        self.locked = False
+        self.blank = False
+        self._last_pointer = None
+        self._last_fingerprint = None
+
+    def _probe(self):
+        if self._probed:
+            return
+        self._probed = True
+        if self._pointer is None:
+            self._pointer = _pointer_reader()
+        if self._lock is None:
+            self._lock = _lock_reader()
+
+    @property
+    def can_poll(self):
+        """Whether activity can be noticed without capturing a frame"""
+        self._probe()
+        return bool(self._pointer or self._lock)
+
+    def _activity(self):
+        self.last_activity = monotonic()
+
+    def reset(self):
+        """Start over when a session starts or resumes: the user counts as active and
+        the next pointer reading and frame become the new baseline"""
+        self._activity()
+        self.blank = False
+        self._last_pointer = None
+        self._last_fingerprint = None
+
+    def check_pointer(self):
+        """Read the pointer; returns True if it moved since the last check"""
+        self._probe()
+        if not self._pointer:
+            return False
+        try:
+            position = tuple(self._pointer())
+        except Exception as e:
+            logger.warning("Could not read pointer position, disabling it for idle detection: %s", e)
+            self._pointer = None
+            return False
+        moved = self._last_pointer is not None and position != self._last_pointer
+        self._last_pointer = position
+        if moved:
+            self._activity()
+        return moved
+
+    def check_lock(self):
+        """Read the OS lock state; returns True while locked"""
+        self._probe()
+        was_locked = self.locked
+        self.locked = bool(self._lock and self._lock())
+        if was_locked and not self.locked:
+            self._activity()  # Unlocking means someone is back
+        return self.locked
+
+    def observe_frame(self, image):
+        """Compare a captured frame against the previous one"""
+        fingerprint = np.asarray(image.convert("L").resize((64, 36), Image.BILINEAR), dtype=np.int16)
+        self.blank = float(fingerprint.std()) < BLANK_FRAME_STDDEV
+        previous, self._last_fingerprint = self._last_fingerprint, fingerprint
+        if previous is not None and float(np.abs(fingerprint - previous).mean()) >= self.frame_threshold:
+            if not self.blank:
+                self._activity()
+
+    def poll(self):
+        """Cheap check for returning activity while idle (no capture); True if the user is back"""
+        moved = self.check_pointer()
+        was_locked = self.locked
+        locked = self.check_lock()
+        return moved or (was_locked and not locked)
+
+    @property
+    def idle(self):
+        return self.locked or self.blank or monotonic() - self.last_activity >= self.timeout
@@ -1,21 +1,36 @@
-from time import time, sleep
+from time import time, sleep, monotonic
 import threading
 import logging
 from app.watcher.screenshot import ScreenshotTaker
+from app.watcher.idle import IdleDetector
 from app.mule.tasks import process_screenshot
+from app.core.settings import settings
 
 logger = logging.getLogger(__name__)
 
 class Monitor:
-    def __init__(self, interval=60, save_directory="screenshots"):
+    def __init__(self, interval=60, save_directory="screenshots", capture_backend=None, process_fn=None,
+                 idle_detector=None, idle_fn=None):
         self.interval = interval
         self.active = False
         self.paused = False  # Add a separate paused flag
         self.start_time = None
         self.user_goal = None
-        self.screenshot_taker = ScreenshotTaker(interval, save_directory)
+        self.screenshot_taker = ScreenshotTaker(interval, save_directory, backend=capture_backend)
+        self.process_fn = process_fn or process_screenshot
         self.monitor_thread = None
         self.latest_alert = None
+        # Suspends capture while the user is away; synthetic frames have no user behind them
+        backend_name = getattr(capture_backend, "name", capture_backend) or settings.capture_backend
+        if idle_detector is None and settings.idle_detection and backend_name != "synthetic":
+            idle_detector = IdleDetector()
+        self.idle_detector = idle_detector or None
+        self.idle_fn = idle_fn
+        self.idle_since = None  # Wall-clock start of the current idle period
+        # Guards the state above; the loop waits on it so stop/pause/resume and
+        # interval changes wake it immediately instead of after a full sleep
+        self._state = threading.Condition()
+        self._tick_started = 0.0
 
     def set_user_goal(self, goal):
         """Set the user's goal for the session"""
@@ -23,78 +38,173 @@ class Monitor:
 
     def start(self):
         """Start monitoring"""
-        if self.active and not self.paused:
-            logger.info("Monitoring is already active.")
-            return
+        with self._state:
+            if self.active and not self.paused:
+                logger.info("Monitoring is already active.")
+                return
+                
+            self.active = True
+            self.paused = False
+            self.start_time = time()
+            if self.idle_detector:
+                self.idle_detector.reset()
+            self._state.notify_all()
+            logger.info("Monitoring started.")
             
-        self.active = True
-        self.paused = False
-        self.start_time = time()
-        logger.info("Monitoring started.")
-        
-        # Start monitoring in a separate thread
-        self.monitor_thread = threading.Thread(target=self._monitoring_loop)
-        self.monitor_thread.daemon = True
-        self.monitor_thread.start()
+            # The previous loop may still be finishing a tick (e.g. waiting on a model call).
+            # It will see active=True and carry on, so never start a second one.
+            if self.monitor_thread is not None and self.monitor_thread.is_alive():
+                return
+            
+            # Start monitoring in a separate thread
+            self.monitor_thread = threading.Thread(target=self._monitoring_loop, name="monitor-loop")
+            self.monitor_thread.daemon = True
+            self.monitor_thread.start()
 
     def _monitoring_loop(self):
         """Main monitoring loop"""
-        while self.active:
-            if not self.paused:  # Only take screenshots if not paused
-                screenshot_path = self.screenshot_taker.take_screenshot()
-                logger.info(f"Screenshot taken at {time() - self.start_time:.2f} seconds.")
-                
-                # Process the screenshot
-                result = process_screenshot(screenshot_path)
-                
-                # Log with model-provided screenshot number
-                ss_no = result.get("ss_no", "unknown")
-                logger.info(f"Model analysis for screenshot #{ss_no}: {result.get('alert_level')} - {result.get('message')}")
-                
-                # Create an alert from the analysis result (if available)
-                try:
-                    from app.api.endpoints.alerts import create_alert_from_analysis
-                    create_alert_from_analysis(result, screenshot_path)
-                except Exception as e:
-                    logger.error(f"Error creating alert: {e}")
+        try:
+            self._run_loop()
+        finally:
+            # Cleared under the lock so start() knows whether this loop is still running
+            with self._state:
+                if self.monitor_thread is threading.current_thread():
+                    self.monitor_thread = None
+
+    def _run_loop(self):
+        while True:
+            with self._state:
+                # Block while paused; stop or resume wakes us up
+                while self.active and self.paused:
+                    self._state.wait()
+                if not self.active:
+                    return
+                self._tick_started = monotonic()
             
-            sleep(self.interval)
+            # A failed capture or analysis skips this tick, not the rest of the session
+            try:
+                self._tick()
+            except Exception as e:
+                logger.error("Monitoring tick failed: %s", e)
+            
+            with self._state:
+                # Wait out the interval, re-reading it so set_interval applies to the current wait
+                while self.active and not self.paused:
+                    remaining = self._tick_started + self.interval - monotonic()
+                    if remaining <= 0:
+                        break
+                    if self.idle_since is None or not self.idle_detector.can_poll:
+                        self._state.wait(remaining)
+                        continue
+                    # While idle, poll the pointer and lock state so the next tick comes as soon as the user is back
+                    self._state.wait(min(remaining, settings.idle_poll_interval))
+                    if self.idle_detector.poll():
+                        break
+
+    def _tick(self):
+        """Take and analyze a single screenshot (unless the user is away)"""
+        image = None
+        detector = self.idle_detector
+        if detector:
+            detector.check_pointer()
+            # Nothing to capture while the screen is locked
+            if not detector.check_lock():
+                image = self.screenshot_taker.grab()
+                detector.observe_frame(image)
+            if detector.idle:
+                self._set_idle(True)
+                return
+            self._set_idle(False)
+
+        screenshot_path = self.screenshot_taker.take_screenshot(image)
+        logger.debug("Screenshot taken at %.2f seconds.", time() - self.start_time)
+        
+        # Process the screenshot
+        result = self.process_fn(screenshot_path)
+        
+        # Log with the session's screenshot number
+        ss_no = result.get("ss_no", "unknown")
+        logger.info("Model analysis for screenshot #%s: %s - %s", ss_no, result.get("alert_level"), result.get("message"))
+        
+        # Create an alert from the analysis result (if available)
+        try:
+            from app.api.endpoints.alerts import create_alert_from_analysis
+            create_alert_from_analysis(result, screenshot_path)
+        except Exception as e:
+            logger.error("Error creating alert: %s", e)
+
+    def _set_idle(self, idle):
+        """Enter or leave the idle state, reporting each finished idle period"""
+        now = time()
+        with self._state:
+            # A tick finishing after stop() must not start a new idle period
+            if idle == (self.idle_since is not None) or (idle and not self.active):
+                return
+            started, self.idle_since = self.idle_since, (now if idle else None)
+        if idle:
+            logger.info("User is idle, suspending capture and analysis")
+            return
+        logger.info("Idle period ended after %.0fs", now - started)
+        try:
+            if self.idle_fn:
+                self.idle_fn(started, now)
+            else:
+                from app.api.endpoints.alerts import record_idle_period
+                record_idle_period(started, now)
+        except Exception as e:
+            logger.error("Error recording idle period: %s", e)
+
+    @property
+    def is_idle(self):
+        return self.idle_since is not None
 
     def stop(self):
         """Stop monitoring"""
-        if not self.active:
-            logger.info("Monitoring is not active.")
-            return
-            
-        self.active = False
-        self.paused = False
-        if self.monitor_thread and self.monitor_thread.is_alive():
-            self.monitor_thread.join(timeout=1.0)
+        with self._state:
+            if not self.active:
+                logger.info("Monitoring is not active.")
+                return
+                
+            self.active = False
+            self.paused = False
+            self._state.notify_all()
+            thread = self.monitor_thread
+        self._set_idle(False)
+        # An idle loop exits immediately; one busy in a tick exits when the tick ends
+        if thread and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout=1.0)
         logger.info("Monitoring stopped.")
 
     def pause(self):
         """Pause monitoring"""
-        if not self.active or self.paused:
-            logger.info("Monitoring is already paused or not active.")
-            return
-            
-        self.paused = True
+        with self._state:
+            if not self.active or self.paused:
+                logger.info("Monitoring is already paused or not active.")
+                return
+                
+            self.paused = True
+            self._state.notify_all()
+        self._set_idle(False)
         logger.info("Monitoring paused.")
 
     def resume(self):
         """Resume monitoring"""
-        if not self.active:
-            # If monitoring was stopped, we need to start from scratch
-            logger.info("Monitoring was not active, starting fresh.")
-            self.start()
-            return
-            
-        if not self.paused:
-            logger.info("Monitoring is already active.")
-            return
-            
-        # Just unpause, don't create a new thread
-        self.paused = False
+        with self._state:
+            if not self.active:
+                # If monitoring was stopped, we need to start from scratch
+                logger.info("Monitoring was not active, starting fresh.")
+                self.start()
+                return
+                
+            if not self.paused:
+                logger.info("Monitoring is already active.")
+                return
+                
+            # Just unpause, don't create a new thread
+            self.paused = False
+            if self.idle_detector:
+                self.idle_detector.reset()
+            self._state.notify_all()
         logger.info("Monitoring resumed.")
         
     @property
@@ -106,8 +216,10 @@ class Monitor:
         """Set the screenshot interval"""
         if interval <= 0:
             raise ValueError("Interval must be greater than zero")
-        self.interval = interval
-        self.screenshot_taker.interval = interval
+        with self._state:
+            self.interval = interval
+            self.screenshot_taker.interval = interval
+            self._state.notify_all()
 
 # Example usage
 if __name__ == "__main__":
@@ -1,23 +1,42 @@
 from datetime import datetime
 import time
-import pyautogui
 import os
 import glob
+import logging
+from app.utils.image_pool import get_image_processor
+from app.watcher.backends import get_capture_backend
+
+logger = logging.getLogger(__name__)
 
 class ScreenshotTaker:
-    def __init__(self, interval: int, save_directory: str, max_screenshots=5):
+    def __init__(self, interval: int, save_directory: str, max_screenshots=5, backend=None):
         self.interval = interval
         self.save_directory = save_directory
         self.max_screenshots = max_screenshots
         self.running = False
+        # Accept either a backend instance or a backend name; named backends are
+        # created on first capture so importing the app doesn't require a display
+        self._backend = backend
         os.makedirs(self.save_directory, exist_ok=True)
 
-    def take_screenshot(self):
-        """Take a screenshot and save it to the specified directory"""
+    @property
+    def backend(self):
+        if self._backend is None or isinstance(self._backend, str):
+            self._backend = get_capture_backend(self._backend)
+        return self._backend
+
+    def grab(self):
+        """Capture a frame without saving it"""
+        return self.backend.grab()
+
+    def take_screenshot(self, screenshot=None):
+        """Take a screenshot (or use an already captured frame) and save it to the specified directory"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         screenshot_path = os.path.join(self.save_directory, f"screenshot_{timestamp}.png")
-        screenshot = pyautogui.screenshot()
-        screenshot.save(screenshot_path)
+        if screenshot is None:
+            screenshot = self.backend.grab()
+        # PNG encoding runs in a worker process so it doesn't hold the GIL
+        get_image_processor().save(screenshot, screenshot_path)
         
         # Keep only the most recent screenshots
         self._cleanup_old_screenshots()
@@ -34,16 +53,16 @@ class ScreenshotTaker:
             oldest = screenshots.pop(0)  # Get the oldest screenshot
             try:
                 os.remove(oldest)
-                print(f"Removed old screenshot: {oldest}")
+                logger.debug("Removed old screenshot: %s", oldest)
             except Exception as e:
-                print(f"Error removing screenshot: {e}")
+                logger.error("Error removing screenshot: %s", e)
 
     def start(self):
         """Start taking screenshots at the specified interval"""
         self.running = True
         while self.running:
             screenshot_path = self.take_screenshot()
-            print(f"Screenshot taken: {screenshot_path}")
+            logger.debug("Screenshot taken: %s", screenshot_path)
             time.sleep(self.interval)
             
     def stop(self):
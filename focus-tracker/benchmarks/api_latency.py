@@ -0,0 +1,86 @@
+# benchmarks/api_latency.py
+"""Measure API latency while slow model calls are in flight.
+
+Starts the app with the fake model (each call takes --model-latency seconds),
+polls /health and /api/session/status from several clients, and compares the
+latency percentiles with and without concurrent key validations and summary
+requests. If a handler blocked the event loop, p99 during model calls would
+jump to roughly the model latency.
+
+Usage:
+    python -m benchmarks.api_latency --model-latency 2 --model-calls 8
+"""
+import argparse
+import asyncio
+import time
+import httpx
+from benchmarks.capture import percentile
+from benchmarks.server import AppServer
+
+POLLED_ROUTES = ["/health", "/api/session/status"]
+
+
+async def poll(client, duration, samples):
+    """Poll the cheap routes until the duration elapses"""
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        for route in POLLED_ROUTES:
+            start = time.perf_counter()
+            await client.get(route)
+            samples.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+
+
+async def model_calls(client, count):
+    """Fire key validations and summary requests concurrently"""
+    requests = []
+    for i in range(count):
+        if i % 2:
+            requests.append(client.get("/api/session/summary"))
+        else:
+            requests.append(client.post("/api/settings/validate-key", json={"api_key": f"key-{i}"}))
+    await asyncio.gather(*requests)
+
+
+async def run(url, clients, duration, calls):
+    async with httpx.AsyncClient(base_url=url, timeout=60.0) as client:
+        # Give the summary endpoint session data so it calls the model
+        await client.post("/api/goals/", json={"text": "Benchmark", "session_duration": 1,
+                                               "screenshot_interval": 3600})
+
+        baseline = []
+        await asyncio.gather(*(poll(client, duration, baseline) for _ in range(clients)))
+
+        loaded = []
+        pollers = asyncio.gather(*(poll(client, duration, loaded) for _ in range(clients)))
+        await asyncio.sleep(0.1)
+        await model_calls(client, calls)
+        await pollers
+
+        await client.post("/api/session/stop")
+    return baseline, loaded
+
+
+def report(name, samples):
+    ms = [s * 1000 for s in samples]
+    print(f"{name:<22} n={len(ms):<6} p50={percentile(ms, 50):.1f}ms p95={percentile(ms, 95):.1f}ms "
+          f"p99={percentile(ms, 99):.1f}ms max={max(ms):.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API latency during in-flight model calls")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per phase")
+    parser.add_argument("--model-latency", type=float, default=2.0)
+    parser.add_argument("--model-calls", type=int, default=8)
+    args = parser.parse_args()
+
+    with AppServer(env={"FAKE_MODEL_LATENCY": str(args.model_latency)}) as server:
+        baseline, loaded = asyncio.run(run(server.url, args.clients, args.duration, args.model_calls))
+
+    report("baseline", baseline)
+    report("during model calls", loaded)
+
+
+if __name__ == "__main__":
+    main()
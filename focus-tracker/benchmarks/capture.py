@@ -0,0 +1,84 @@
+# benchmarks/capture.py
+"""Capture-latency benchmark for the screen capture backends.
+
+Usage:
+    python -m benchmarks.capture --backend synthetic
+    xvfb-run -s "-screen 0 1920x1080x24" python -m benchmarks.capture --backend x11 --backend pyautogui
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from app.watcher.backends import BACKENDS, get_capture_backend
+from app.watcher.screenshot import ScreenshotTaker
+
+
+def percentile(values, pct):
+    """Return the given percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Summarize latency samples (seconds) in milliseconds"""
+    ms = [s * 1000 for s in samples]
+    return {
+        "mean_ms": statistics.mean(ms),
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "max_ms": max(ms),
+    }
+
+
+def bench_backend(name, iterations=50, warmup=3, save=False):
+    """Measure grab latency (and optionally grab+save latency) for one backend"""
+    backend = get_capture_backend(name)
+    try:
+        for _ in range(warmup):
+            backend.grab()
+
+        grab_samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            backend.grab()
+            grab_samples.append(time.perf_counter() - start)
+        results = {"grab": summarize(grab_samples)}
+
+        if save:
+            with tempfile.TemporaryDirectory() as tmp:
+                taker = ScreenshotTaker(0, tmp, backend=backend)
+                save_samples = []
+                for _ in range(iterations):
+                    start = time.perf_counter()
+                    taker.take_screenshot()
+                    save_samples.append(time.perf_counter() - start)
+                results["take_screenshot"] = summarize(save_samples)
+        return results
+    finally:
+        backend.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark screen capture backends")
+    parser.add_argument("--backend", action="append", choices=sorted(BACKENDS),
+                        help="Backend to benchmark (repeatable, default: all)")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--save", action="store_true", help="Also time the full take_screenshot path")
+    args = parser.parse_args()
+
+    for name in args.backend or sorted(BACKENDS):
+        try:
+            results = bench_backend(name, args.iterations, save=args.save)
+        except Exception as e:
+            print(f"{name:<10} unavailable: {e}")
+            continue
+        for stage, stats in results.items():
+            print(f"{name:<10} {stage:<16} mean={stats['mean_ms']:.2f}ms p50={stats['p50_ms']:.2f}ms "
+                  f"p95={stats['p95_ms']:.2f}ms max={stats['max_ms']:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
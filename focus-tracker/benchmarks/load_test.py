@@ -0,0 +1,238 @@
+# benchmarks/load_test.py
+"""Load-test the API with simulated dashboards.
+
+Starts the app with the fake model and synthetic capture, begins a session so
+the monitor produces real alerts, optionally seeds extra alerts to grow the
+alert list faster, and runs N clients that follow the static/js/app.js
+request pattern: load the page, poll /api/alerts/ and /api/session/status on
+the dashboard interval, occasionally pause and resume, and fetch the session
+summary. Every report window prints throughput, per-route latency
+percentiles and the server's CPU and RSS against the current alert count,
+so endpoint and storage changes can be compared run to run.
+
+Usage:
+    python -m benchmarks.load_test --clients 50 --duration 60
+    python -m benchmarks.load_test --clients 200 --poll-interval 1 --seed-rate 200 --output run.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import defaultdict
+import httpx
+from benchmarks.capture import percentile
+from benchmarks.server import AppServer
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+class ProcessSampler:
+    """CPU time and RSS of the server process, read from /proc (Linux only)"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self._last = None
+
+    def cpu_seconds(self):
+        with open(f"/proc/{self.pid}/stat") as f:
+            # Fields after the parenthesised command name; utime and stime are 14 and 15
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+    def rss_mb(self):
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+        return 0.0
+
+    def sample(self):
+        """CPU percent since the previous sample and the current RSS"""
+        try:
+            now, cpu = time.monotonic(), self.cpu_seconds()
+            rss = self.rss_mb()
+        except (OSError, IndexError, ValueError):
+            return None, None
+        percent = None
+        if self._last:
+            elapsed = now - self._last[0]
+            percent = (cpu - self._last[1]) / elapsed * 100 if elapsed else 0.0
+        self._last = (now, cpu)
+        return percent, rss
+
+
+class LoadTest:
+    def __init__(self, url, clients, duration, poll_interval, pause_probability, summary_probability,
+                 seed_rate, report_interval):
+        self.url = url
+        self.clients = clients
+        self.duration = duration
+        self.poll_interval = poll_interval
+        self.pause_probability = pause_probability
+        self.summary_probability = summary_probability
+        self.seed_rate = seed_rate
+        self.report_interval = report_interval
+        # Samples of the current report window: route -> latencies (seconds)
+        self.window = defaultdict(list)
+        self.totals = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.alert_count = 0
+        self.windows = []
+
+    async def request(self, client, method, route, label=None, **kwargs):
+        label = label or f"{method} {route}"
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, route, **kwargs)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            self.errors[label] += 1
+            return None
+        latency = time.perf_counter() - start
+        self.window[label].append(latency)
+        self.totals[label].append(latency)
+        return response
+
+    async def dashboard(self, end):
+        """One browser tab running the session view of app.js"""
+        async with httpx.AsyncClient(base_url=self.url, timeout=30.0) as client:
+            await self.request(client, "GET", "/")
+            await self.request(client, "GET", "/static/js/app.js")
+            # Spread the clients over one poll interval, like tabs opened at different times
+            await asyncio.sleep(random.uniform(0, self.poll_interval))
+            paused = False
+            while time.monotonic() < end:
+                response = await self.request(client, "GET", "/api/alerts/")
+                if response is not None:
+                    self.alert_count = max(self.alert_count, len(response.json()))
+                await self.request(client, "GET", "/api/session/status")
+
+                roll = random.random()
+                if roll < self.pause_probability:
+                    route = "/api/session/resume" if paused else "/api/session/pause"
+                    await self.request(client, "POST", route)
+                    paused = not paused
+                elif roll < self.pause_probability + self.summary_probability:
+                    await self.request(client, "GET", "/api/session/summary")
+                await asyncio.sleep(self.poll_interval)
+            if paused:
+                await self.request(client, "POST", "/api/session/resume")
+
+    async def seed_alerts(self, end):
+        """Grow the alert list faster than the monitor alone would"""
+        if self.seed_rate <= 0:
+            return
+        levels = ["NORMAL", "NORMAL", "NORMAL", "CAUTION", "ALERT"]
+        async with httpx.AsyncClient(base_url=self.url, timeout=30.0) as client:
+            while time.monotonic() < end:
+                alert = {"message": "Seeded load-test alert with a realistic explanation length " * 2,
+                         "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                         "alert_level": random.choice(levels), "confidence": random.uniform(50, 100)}
+                await self.request(client, "POST", "/api/alerts/", label="POST /api/alerts/ (seed)", json=alert)
+                await asyncio.sleep(1 / self.seed_rate)
+
+    async def reporter(self, sampler, end):
+        sampler.sample()
+        window_start = time.monotonic()
+        while time.monotonic() < end:
+            await asyncio.sleep(self.report_interval)
+            now = time.monotonic()
+            cpu, rss = sampler.sample()
+            window, self.window = self.window, defaultdict(list)
+            self.windows.append(self.summarize(window, now - window_start, cpu, rss))
+            self.print_window(self.windows[-1])
+            window_start = now
+
+    def summarize(self, samples, elapsed, cpu=None, rss=None):
+        routes = {}
+        for label, latencies in sorted(samples.items()):
+            ms = [s * 1000 for s in latencies]
+            routes[label] = {
+                "requests": len(ms),
+                "p50_ms": percentile(ms, 50),
+                "p95_ms": percentile(ms, 95),
+                "p99_ms": percentile(ms, 99),
+                "max_ms": max(ms),
+            }
+        total = sum(len(v) for v in samples.values())
+        return {
+            "elapsed": elapsed,
+            "alerts": self.alert_count,
+            "requests": total,
+            "requests_per_second": total / elapsed if elapsed else 0.0,
+            "server_cpu_percent": cpu,
+            "server_rss_mb": rss,
+            "routes": routes,
+        }
+
+    @staticmethod
+    def print_window(window):
+        cpu = window["server_cpu_percent"]
+        rss = window["server_rss_mb"]
+        print(f"alerts={window['alerts']:<7} rps={window['requests_per_second']:<8.1f} "
+              f"cpu={'-' if cpu is None else f'{cpu:.0f}%':<6} rss={'-' if rss is None else f'{rss:.1f}MB'}")
+        for label, stats in window["routes"].items():
+            print(f"    {label:<32} n={stats['requests']:<6} p50={stats['p50_ms']:.1f}ms "
+                  f"p95={stats['p95_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms")
+
+    async def run(self, server_pid, screenshot_interval):
+        async with httpx.AsyncClient(base_url=self.url, timeout=60.0) as client:
+            response = await client.post("/api/goals/", json={
+                "text": "Load test", "session_duration": 60, "screenshot_interval": screenshot_interval})
+            response.raise_for_status()
+
+            started = time.monotonic()
+            end = started + self.duration
+            await asyncio.gather(
+                self.reporter(ProcessSampler(server_pid), end),
+                self.seed_alerts(end),
+                *(self.dashboard(end) for _ in range(self.clients)),
+            )
+            wall_time = time.monotonic() - started
+
+            await client.post("/api/session/stop")
+            await self.request(client, "GET", "/api/session/summary")
+
+        result = self.summarize(self.totals, wall_time)
+        result["errors"] = dict(self.errors)
+        result["windows"] = self.windows
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate dashboard clients against a local app")
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent dashboards")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="Dashboard poll interval (app.js: 5s)")
+    parser.add_argument("--screenshot-interval", type=int, default=1, help="Monitor interval for the session")
+    parser.add_argument("--pause-probability", type=float, default=0.01, help="Chance per poll to pause/resume")
+    parser.add_argument("--summary-probability", type=float, default=0.005, help="Chance per poll to fetch the summary")
+    parser.add_argument("--seed-rate", type=float, default=0.0, help="Extra alerts posted per second")
+    parser.add_argument("--report-interval", type=float, default=5.0)
+    parser.add_argument("--model-latency", type=float, default=0.0, help="Fake model latency (seconds)")
+    parser.add_argument("--output", help="Write the full results as JSON to this file")
+    args = parser.parse_args()
+
+    # Keep the server's per-request logging out of the report
+    env = {"FAKE_MODEL_LATENCY": str(args.model_latency), "LOG_LEVEL": "WARNING"}
+    with AppServer(env=env) as server:
+        test = LoadTest(server.url, args.clients, args.duration, args.poll_interval, args.pause_probability,
+                        args.summary_probability, args.seed_rate, args.report_interval)
+        result = asyncio.run(test.run(server.process.pid, args.screenshot_interval))
+
+    print(f"\nTotal: {result['requests']} requests in {result['elapsed']:.1f}s "
+          f"({result['requests_per_second']:.1f} req/s), final alert count {result['alerts']}")
+    for label, stats in result["routes"].items():
+        print(f"    {label:<32} n={stats['requests']:<6} p50={stats['p50_ms']:.1f}ms "
+              f"p95={stats['p95_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms max={stats['max_ms']:.1f}ms")
+    if result["errors"]:
+        print(f"Errors: {result['errors']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
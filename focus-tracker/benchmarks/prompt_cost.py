@@ -0,0 +1,109 @@
+# benchmarks/prompt_cost.py
+"""Input tokens and per-frame latency of the analysis requests.
+
+Runs the analyzer over synthetic frames with the local fake model (which
+estimates the input tokens of every request, history and system instruction
+included) and compares the current requests against resending the full,
+indented instructions with every frame, as before.
+
+- With history: the live monitor and sequential replays. The instructions
+  go out once at the start of the chat, and later frames send a short prompt.
+- Stateless: backfill and concurrent replays. Every request still carries
+  the full instructions. With the pinned SDK the only saving is the
+  dedented text.
+- System instruction: the same stateless frames through the shared model
+  handles, with a newer SDK's system_instruction support simulated. The
+  instructions are bound to the handle instead of each prompt, but the
+  fake model still counts them per request, since the API bills them that
+  way without context caching.
+
+Usage:
+    python -m benchmarks.prompt_cost --frames 50 --model-latency 0.05
+"""
+import argparse
+import os
+import random
+import tempfile
+import textwrap
+import time
+from PIL import Image, ImageDraw
+from benchmarks.capture import summarize
+from app.core.settings import settings
+from app.utils import image_analysis, model_client
+from app.utils.fake_model import FakeGenerativeModel
+from app.utils.image_analysis import ANALYSIS_INSTRUCTIONS, GeminiAnalyzer, session_instructions
+
+GOAL = "Write the quarterly report in the company wiki"
+
+
+class InstructionsEveryFrame(GeminiAnalyzer):
+    """Baseline: the indented instructions are rebuilt and sent with every frame, as before"""
+
+    def _ask_model(self, model, image_bytes, prompt, history):
+        prompt = "\n" + textwrap.indent(ANALYSIS_INSTRUCTIONS.format(goal=GOAL), " " * 12)
+        return super()._ask_model(model, image_bytes, prompt, history)
+
+
+def make_frames(directory, count, size=(640, 360)):
+    """Write simple, distinct JPEG frames"""
+    rng = random.Random(0)
+    paths = []
+    for i in range(count):
+        image = Image.new("RGB", size, (240, 240, 240))
+        draw = ImageDraw.Draw(image)
+        for _ in range(8):
+            x, y = rng.randrange(size[0]), rng.randrange(size[1])
+            draw.rectangle((x, y, x + 80, y + 20), fill=tuple(rng.randrange(256) for _ in range(3)))
+        path = os.path.join(directory, f"frame_{i:04d}.jpg")
+        image.save(path, format="JPEG", quality=70)
+        paths.append(path)
+    return paths
+
+
+def run(analyzer_class, frames, use_history, latency):
+    model = FakeGenerativeModel("fake", latency=latency)
+    analyzer = analyzer_class(model=model)
+    samples = []
+    for path in frames:
+        start = time.perf_counter()
+        analyzer.analyze_raw(path, GOAL, use_history=use_history)
+        samples.append(time.perf_counter() - start)
+    return model.input_tokens / len(frames), summarize(samples)
+
+
+def run_system_instruction(frames, latency):
+    """Stateless frames through the shared handles, as if the SDK took a system_instruction"""
+    settings.model_backend = "fake"
+    settings.fake_model_latency = latency
+    model_client.SUPPORTS_SYSTEM_INSTRUCTION = image_analysis.SUPPORTS_SYSTEM_INSTRUCTION = True
+    analyzer = GeminiAnalyzer(tiers=[("fake-shared", None)])
+    samples = []
+    for path in frames:
+        start = time.perf_counter()
+        analyzer.analyze_raw(path, GOAL, use_history=False)
+        samples.append(time.perf_counter() - start)
+    model = model_client.model_clients.get_model("fake-shared", system_instruction=session_instructions(GOAL))
+    return model.input_tokens / len(frames), summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Input tokens and latency of the per-frame analysis requests")
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--model-latency", type=float, default=0.0, help="Simulated model latency (seconds)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        frames = make_frames(tmp, args.frames)
+        for use_history, mode in ((False, "stateless"), (True, "with history")):
+            for name, analyzer_class in (("every frame", InstructionsEveryFrame), ("compiled once", GeminiAnalyzer)):
+                tokens, latency = run(analyzer_class, frames, use_history, args.model_latency)
+                print(f"{mode:<13} {name:<14} tokens/frame={tokens:>8.0f}  "
+                      f"mean={latency['mean_ms']:.2f}ms p95={latency['p95_ms']:.2f}ms")
+        # Last, since it switches the process to the (simulated) newer SDK
+        tokens, latency = run_system_instruction(frames, args.model_latency)
+        print(f"{'stateless':<13} {'system instr.':<14} tokens/frame={tokens:>8.0f}  "
+              f"mean={latency['mean_ms']:.2f}ms p95={latency['p95_ms']:.2f}ms  (simulated SDK support)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# benchmarks/scheduler.py
+"""Checks that the model scheduler's fairness and shedding actually engage.
+
+- Fair shares: sessions with different weights (including a backfill
+  session at SCHEDULER_LATE_WEIGHT) each submit frames back to back from
+  their own thread, like the live monitor and capture agents do, while a
+  single model slot is contended. Admitted frames should split in
+  proportion to the weights.
+- Stale frames: a frame that waits behind a slow call for longer than
+  max_frame_age is dropped.
+- Superseded frames: a capture agent's backlog in the ingest queue is cut to
+  the newest SCHEDULER_MAX_QUEUE_PER_SESSION frames by the analysis worker.
+- Expiry: sessions and API keys that went idle are forgotten.
+
+Exits non-zero if any check fails.
+
+Usage:
+    python -m benchmarks.scheduler --seconds 3
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from PIL import Image
+from app.core.settings import settings
+from app.mule.scheduler import ModelScheduler
+
+WEIGHTS = {"live": 1.0, "agent:a": 1.0, "agent:b": 2.0}
+
+
+def fair_shares(seconds, latency):
+    """Admitted frames per session when every session keeps one frame waiting"""
+    scheduler = ModelScheduler(concurrency=1, key_rate_per_minute=0, session_rate_per_minute=0, max_frame_age=0)
+    weights = dict(WEIGHTS, **{"live:late": scheduler.late_weight})
+    for name, weight in WEIGHTS.items():
+        scheduler.set_weight(name, weight)
+    deadline = time.monotonic() + seconds
+
+    def submit(name):
+        while time.monotonic() < deadline:
+            scheduler.run(name, lambda: time.sleep(latency))
+
+    threads = [threading.Thread(target=submit, args=(name,)) for name in weights]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = scheduler.stats()["sessions"]
+    total = sum(s["admitted"] for s in stats.values())
+    total_weight = sum(weights.values())
+    return {name: (stats[name]["admitted"] / total, weight / total_weight) for name, weight in weights.items()}
+
+
+def stale_frames(max_age):
+    """Frames shed after waiting behind a call longer than max_age"""
+    scheduler = ModelScheduler(concurrency=1, key_rate_per_minute=0, session_rate_per_minute=0,
+                               max_frame_age=max_age)
+    busy = threading.Thread(target=scheduler.run, args=("slow", lambda: time.sleep(max_age * 3)))
+    busy.start()
+    time.sleep(max_age / 4)
+    result = scheduler.run("waiting", lambda: {"status": "success"}, captured_at=time.time())
+    busy.join()
+    return result.get("shed", False), scheduler.stats()["sessions"]["waiting"]["shed"]
+
+
+def superseded_frames(backlog):
+    """(analyzed, skipped) frames when a worker finds an agent's backlog"""
+    from app.mule.ingest import IngestQueue
+    from app.mule.worker import AnalysisWorker
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = IngestQueue(os.path.join(tmp, "ingest"))
+        now = time.time()
+        for i in range(backlog):
+            frame = io.BytesIO()
+            Image.new("RGB", (64, 36), (i * 7 % 256, 80, 80)).save(frame, format="JPEG")
+            queue.put("bench", frame.getvalue(), {"timestamp": now + i, "goal": "Benchmark", "received_at": now})
+        AnalysisWorker(queue).run_once()
+        with open(os.path.join(queue.results_dir, "bench.jsonl")) as f:
+            results = [line for line in f if line.strip()]
+        skipped = sum('"shed": true' in line for line in results)
+        return len(results) - skipped, skipped, len(queue.pending("bench"))
+
+
+def expiry():
+    """Sessions and keys left after they idled past idle_expiry"""
+    scheduler = ModelScheduler(concurrency=1, key_rate_per_minute=0, session_rate_per_minute=0,
+                               max_frame_age=0, idle_expiry=0.05)
+    for i in range(20):
+        scheduler.run(f"agent:{i}", lambda: None, api_key=f"key-{i}")
+    time.sleep(0.1)
+    scheduler._expired_at -= 60  # Don't wait out the once-a-minute sweep
+    scheduler.run("live", lambda: None, api_key="key-live")
+    return len(scheduler.sessions), len(scheduler.keys), any("key-" in key for key in scheduler.keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the model scheduler's fairness and shedding")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Duration of the fair-share run")
+    parser.add_argument("--latency", type=float, default=0.005, help="Simulated model call (seconds)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative error of each share")
+    args = parser.parse_args()
+
+    settings.model_backend = "fake"
+    settings.image_workers = 0
+    settings.scheduler_key_rpm = 0
+    settings.scheduler_session_rpm = 0
+
+    checks = []
+    shares = fair_shares(args.seconds, args.latency)
+    for name, (share, expected) in shares.items():
+        ok = abs(share - expected) <= args.tolerance * expected
+        checks.append((ok, f"share of {name:<10} {share:6.1%} (weight share {expected:.1%})"))
+
+    shed, count = stale_frames(0.1)
+    checks.append((shed and count == 1, f"stale frame shed: {shed} ({count} counted)"))
+
+    keep = settings.scheduler_max_queue_per_session
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            analyzed, skipped, left = superseded_frames(12)
+        finally:
+            os.chdir(cwd)
+    checks.append((analyzed == keep and skipped == 12 - keep and not left,
+                   f"agent backlog of 12: {analyzed} analyzed, {skipped} superseded, {left} left"))
+
+    sessions, keys, raw_keys = expiry()
+    checks.append((sessions == 1 and keys == 1 and not raw_keys,
+                   f"after idling: {sessions} session(s), {keys} key(s) kept, raw keys stored: {raw_keys}"))
+
+    failed = False
+    for ok, line in checks:
+        failed |= not ok
+        print(f"{'PASS' if ok else 'FAIL'}  {line}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
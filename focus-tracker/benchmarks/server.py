@@ -0,0 +1,77 @@
+# benchmarks/server.py
+"""Start the Focus Tracker app in a subprocess for benchmarks and load tests."""
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class AppServer:
+    """Run uvicorn against app.main in its own process and working directory.
+
+    Defaults to the fake model and the synthetic capture backend so no API key
+    or display is needed; extra settings can be passed as environment overrides.
+    """
+
+    def __init__(self, env=None, port=None):
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.env = {
+            "MODEL_BACKEND": "fake",
+            "CAPTURE_BACKEND": "synthetic",
+            "API_KEY": "benchmark",
+        }
+        self.env.update(env or {})
+        self.process = None
+        self._workdir = None
+
+    def start(self, timeout=30.0):
+        self._workdir = tempfile.TemporaryDirectory()
+        env = dict(os.environ)
+        env.update(self.env)
+        env["PYTHONPATH"] = PROJECT_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--log-level", "warning"],
+            cwd=self._workdir.name, env=env,
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("App server exited during startup")
+            try:
+                if httpx.get(self.url + "/health", timeout=1.0).status_code == 200:
+                    return self
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        self.stop()
+        raise RuntimeError("App server did not become healthy in time")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self._workdir:
+            self._workdir.cleanup()
+            self._workdir = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
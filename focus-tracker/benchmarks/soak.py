@@ -0,0 +1,289 @@
+# benchmarks/soak.py
+"""Soak test: a long session in accelerated time, checked for leaks.
+
+Runs the app in this process with the fake model and synthetic capture,
+starts a session through the API and shortens the monitor's interval so a
+simulated 8-24 hour session of --tick-seconds ticks completes in minutes.
+Dashboard requests keep polling the API in between. After every window of
+ticks it samples RSS (including the image worker processes), the number of
+live Python objects, open file descriptors, per-tick and API latency and
+log records per tick.
+
+Growth is measured as the least-squares slope over the windows after
+warm-up, extrapolated per simulated hour (latency and log volume as the
+relative change across the session). Warm-up lasts until the in-memory
+alert list has reached MAX_ALERTS_IN_MEMORY, since it legitimately grows
+until then, and at least --warmup-hours of simulated time. The run fails,
+exiting non-zero, if any metric exceeds its budget or the session was too
+short to leave MIN_STEADY_SAMPLES samples after warm-up. With the defaults
+(5s ticks, 1000 alerts) that takes a session of at least 2 hours.
+
+Idle detection (off for synthetic capture) and the scheduler's quotas and
+stale-frame shedding (disabled so accelerated ticks aren't throttled) are
+not exercised by this test.
+
+Usage:
+    python -m benchmarks.soak --hours 8
+    python -m benchmarks.soak --hours 24 --interval 0.005 --output soak.json
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from benchmarks.capture import percentile
+from benchmarks.load_test import ProcessSampler
+
+# Fake model, synthetic frames and no quotas in accelerated time
+SOAK_SETTINGS = {
+    "model_backend": "fake",
+    "capture_backend": "synthetic",
+    "api_key": "soak",
+    "scheduler_key_rpm": 0,
+    "scheduler_session_rpm": 0,
+    "scheduler_max_frame_age": 0,
+    "ingest_workers": 0,
+}
+
+# Seconds without a tick after which the monitor is considered stuck
+STALL_TIMEOUT = 30.0
+
+# Samples needed after warm-up for the growth estimates to mean anything
+MIN_STEADY_SAMPLES = 8
+
+DASHBOARD_ROUTES = ["/api/session/status", "/api/alerts/"]
+
+
+class RecordCounter(logging.Handler):
+    """Counts log records without writing them anywhere"""
+
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.records = 0
+
+    def emit(self, record):
+        self.records += 1
+
+
+def child_pids(pid):
+    """Direct child processes (e.g. image workers), read from /proc"""
+    pids = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                pids.extend(int(p) for p in f.read().split())
+    except OSError:
+        pass
+    return pids
+
+
+def total_rss_mb(pid):
+    return sum(ProcessSampler(p).rss_mb() for p in [pid] + child_pids(pid))
+
+
+def open_fds():
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return 0
+
+
+def slope(xs, ys):
+    """Least-squares slope of ys over xs"""
+    if len(xs) < 2:
+        return 0.0
+    mean_x, mean_y = statistics.mean(xs), statistics.mean(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance if variance else 0.0
+
+
+def relative_growth(values):
+    """Change from the first to the last quarter of the values, relative to the first"""
+    quarter = max(1, len(values) // 4)
+    first, last = statistics.mean(values[:quarter]), statistics.mean(values[-quarter:])
+    return (last - first) / first if first else 0.0
+
+
+class SoakTest:
+    def __init__(self, hours, tick_seconds, interval, windows, warmup_hours, api_polls):
+        self.ticks_total = int(hours * 3600 / tick_seconds)
+        self.tick_seconds = tick_seconds
+        self.interval = interval
+        self.window_ticks = max(1, self.ticks_total // windows)
+        self.warmup_hours = warmup_hours
+        self.alert_cap = None
+        self.api_polls = api_polls
+        self.samples = []
+        self.tick_latencies = []
+        self.ticks = 0
+
+    def run(self):
+        # Applied before the app modules are imported, since some read settings at import time
+        from app.core.settings import settings
+        for name, value in SOAK_SETTINGS.items():
+            setattr(settings, name, value)
+        # Imported here, after the working directory is set up
+        from fastapi.testclient import TestClient
+        from app.main import app
+        from app.api.endpoints import alerts
+        self.alert_cap = settings.max_alerts_in_memory
+
+        counter = RecordCounter()
+        logging.getLogger().addHandler(counter)
+        monitor = alerts.monitor
+
+        # Time every monitor tick (capture, encode, analysis, alert)
+        tick = monitor._tick
+
+        def timed_tick():
+            start = time.perf_counter()
+            tick()
+            self.tick_latencies.append(time.perf_counter() - start)
+            self.ticks += 1
+        monitor._tick = timed_tick
+
+        client = TestClient(app)
+        response = client.post("/api/goals/", json={"text": "Soak test", "session_duration": 60 * 24,
+                                                   "screenshot_interval": int(self.tick_seconds)})
+        response.raise_for_status()
+        monitor.set_interval(self.interval)
+
+        pid = os.getpid()
+        started = time.monotonic()
+        next_sample = self.window_ticks
+        records = counter.records
+        try:
+            while self.ticks < self.ticks_total:
+                # Dashboards poll the API while the session runs
+                api_latencies = []
+                progress = (self.ticks, time.monotonic())
+                while self.ticks < next_sample:
+                    if self.ticks != progress[0]:
+                        progress = (self.ticks, time.monotonic())
+                    elif time.monotonic() - progress[1] > STALL_TIMEOUT:
+                        raise RuntimeError(f"Monitor stopped ticking after {self.ticks} ticks")
+                    for route in DASHBOARD_ROUTES[:self.api_polls]:
+                        start = time.perf_counter()
+                        client.get(route)
+                        api_latencies.append(time.perf_counter() - start)
+                    time.sleep(self.interval * 5)
+
+                window = self.tick_latencies[-self.window_ticks:]
+                gc.collect()
+                ticks = self.ticks
+                sample = {
+                    "ticks": ticks,
+                    "simulated_hours": ticks * self.tick_seconds / 3600,
+                    "elapsed": time.monotonic() - started,
+                    "rss_mb": total_rss_mb(pid),
+                    "objects": len(gc.get_objects()),
+                    "open_fds": open_fds(),
+                    "tick_p50_ms": percentile(window, 50) * 1000,
+                    "tick_p95_ms": percentile(window, 95) * 1000,
+                    "api_p95_ms": percentile(api_latencies, 95) * 1000,
+                    "log_records_per_tick": (counter.records - records) / max(1, len(window)),
+                    "alerts": len(alerts.alerts_db),
+                }
+                records = counter.records
+                self.samples.append(sample)
+                print(f"{sample['simulated_hours']:6.2f}h  ticks={ticks:<6} rss={sample['rss_mb']:7.1f}MB "
+                      f"objects={sample['objects']:<8} fds={sample['open_fds']:<4} "
+                      f"tick p50={sample['tick_p50_ms']:.2f}ms p95={sample['tick_p95_ms']:.2f}ms "
+                      f"api p95={sample['api_p95_ms']:.2f}ms logs/tick={sample['log_records_per_tick']:.2f} "
+                      f"alerts={sample['alerts']}", flush=True)
+                next_sample = ticks + self.window_ticks
+        finally:
+            client.post("/api/session/stop")
+            logging.getLogger().removeHandler(counter)
+        return self.samples
+
+    def steady_samples(self):
+        """Samples taken once the alert list is full and warm-up time has passed"""
+        return [s for s in self.samples
+                if s["alerts"] >= self.alert_cap and s["simulated_hours"] >= self.warmup_hours]
+
+    def minimum_hours(self):
+        """Rough session length needed to leave MIN_STEADY_SAMPLES after warm-up"""
+        warmup = max(self.warmup_hours, self.alert_cap * self.tick_seconds / 3600)
+        window_hours = self.window_ticks * self.tick_seconds / 3600
+        return warmup + (MIN_STEADY_SAMPLES + 1) * window_hours
+
+    def trends(self):
+        """Growth of each metric over the samples after warm-up (None if too few)"""
+        steady = self.steady_samples()
+        if len(steady) < MIN_STEADY_SAMPLES:
+            return None
+        hours = [s["simulated_hours"] for s in steady]
+        return {
+            "rss_mb_per_hour": slope(hours, [s["rss_mb"] for s in steady]),
+            "objects_per_hour": slope(hours, [s["objects"] for s in steady]),
+            "open_fds_growth": steady[-1]["open_fds"] - steady[0]["open_fds"],
+            "tick_p95_growth": relative_growth([s["tick_p95_ms"] for s in steady]),
+            "api_p95_growth": relative_growth([s["api_p95_ms"] for s in steady]),
+            "log_records_growth": relative_growth([s["log_records_per_tick"] for s in steady]),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-session soak test in accelerated time")
+    parser.add_argument("--hours", type=float, default=8.0, help="Simulated session length")
+    parser.add_argument("--tick-seconds", type=float, default=5.0, help="Simulated screenshot interval")
+    parser.add_argument("--interval", type=float, default=0.01, help="Real seconds between ticks")
+    parser.add_argument("--windows", type=int, default=32, help="Number of samples over the session")
+    parser.add_argument("--warmup-hours", type=float, default=0.5,
+                        help="Simulated time ignored before measuring growth (also until the alert list is full)")
+    parser.add_argument("--api-polls", type=int, default=len(DASHBOARD_ROUTES),
+                        help="Dashboard routes polled between ticks (0 = none)")
+    # Budgets
+    parser.add_argument("--max-rss-mb-per-hour", type=float, default=4.0)
+    parser.add_argument("--max-objects-per-hour", type=float, default=1000)
+    parser.add_argument("--max-fd-growth", type=int, default=4)
+    parser.add_argument("--max-latency-growth", type=float, default=0.5,
+                        help="Allowed relative growth of tick and API p95 latency over the session")
+    parser.add_argument("--max-log-growth", type=float, default=0.5,
+                        help="Allowed relative growth of log records per tick")
+    parser.add_argument("--output", help="Write the samples and trends as JSON to this file")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        test = SoakTest(args.hours, args.tick_seconds, args.interval, args.windows, args.warmup_hours,
+                        args.api_polls)
+        test.run()
+        trends = test.trends()
+        if trends is None:
+            print(f"\nFAIL  only {len(test.steady_samples())} samples after warm-up (need {MIN_STEADY_SAMPLES}); "
+                  f"run at least --hours {test.minimum_hours():.1f} with these settings")
+            os.chdir("/")
+            sys.exit(1)
+
+        checks = [
+            ("RSS growth", trends["rss_mb_per_hour"], args.max_rss_mb_per_hour, "MB/h"),
+            ("object growth", trends["objects_per_hour"], args.max_objects_per_hour, "objects/h"),
+            ("open file growth", trends["open_fds_growth"], args.max_fd_growth, "fds"),
+            ("tick p95 latency growth", trends["tick_p95_growth"] * 100, args.max_latency_growth * 100, "%"),
+            ("API p95 latency growth", trends["api_p95_growth"] * 100, args.max_latency_growth * 100, "%"),
+            ("log volume growth", trends["log_records_growth"] * 100, args.max_log_growth * 100, "%"),
+        ]
+        failed = False
+        print()
+        for name, value, budget, unit in checks:
+            ok = value <= budget
+            failed |= not ok
+            print(f"{'PASS' if ok else 'FAIL'}  {name:<24} {value:10.2f} {unit:<9} (budget {budget:g})")
+
+        if output:
+            with open(output, "w") as f:
+                json.dump({"samples": test.samples, "trends": trends}, f, indent=2)
+        # Leave the temporary directory before it is removed
+        os.chdir("/")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""Tests for the analytics rollups"""
+from app.analytics.rollups import SessionRollup
+
+
+class RecordingStore:
+    def __init__(self):
+        self.deltas = []
+
+    def add(self, goal, timestamp, deltas):
+        self.deltas.append(deltas)
+
+
+def test_api_calls_follow_model_calls():
+    store = RecordingStore()
+    rollup = SessionRollup(store, "Write the report", 5)
+    rollup.record({"status": "success", "alert_level": "POSITIVE", "model_calls": 3}, 0)
+    rollup.record({"status": "success", "alert_level": "POSITIVE"}, 5)
+    rollup.record({"status": "success", "alert_level": "POSITIVE", "reused": True}, 10)
+    # Spooled when the model was unreachable; counted when the backfill analyzes it
+    rollup.record({"status": "error", "alert_level": "ERROR", "retryable": True, "spooled": True}, 15)
+    rollup.record({"status": "success", "alert_level": "POSITIVE", "model_calls": 1, "late": True}, 15)
+    assert [d["api_calls"] for d in store.deltas] == [3, 1, 0, 0, 1]
@@ -0,0 +1,16 @@
+"""Tests for the screenshot analyzer"""
+from PIL import Image
+from app.core.settings import settings
+from app.utils.image_analysis import GeminiAnalyzer
+
+
+def test_screenshot_numbers_survive_history_trimming(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "model_backend", "fake")
+    monkeypatch.setattr(settings, "analysis_history_turns", 2)
+    analyzer = GeminiAnalyzer(tiers=[("fake-flash", None)])
+    numbers = []
+    for i in range(8):
+        path = tmp_path / f"frame_{i}.png"
+        Image.new("RGB", (32, 18), (i * 30, 80, 80)).save(path)
+        numbers.append(analyzer.analyze_raw(str(path), "Write the report")["ss_no"])
+    assert numbers == list(range(1, 9))
@@ -0,0 +1,52 @@
+"""Tests for the shared ingest queue"""
+import json
+import os
+import time
+from app.mule.ingest import IngestQueue
+
+
+def age_claim(queue, agent_id, seconds):
+    claim_path = os.path.join(queue.claims_dir, agent_id)
+    past = time.time() - seconds
+    os.utime(claim_path, (past, past))
+
+
+def test_claim_is_exclusive(tmp_path):
+    queue = IngestQueue(str(tmp_path), claim_timeout=60)
+    token = queue.claim("desk")
+    assert token
+    assert queue.claim("desk") is None
+    queue.release("desk", token)
+    assert queue.claim("desk")
+
+
+def test_taken_over_claim_fences_off_previous_owner(tmp_path):
+    queue = IngestQueue(str(tmp_path), claim_timeout=60)
+    first = queue.claim("desk")
+    age_claim(queue, "desk", 120)
+    second = queue.claim("desk")
+    assert second and second != first
+
+    # The stalled worker finishes its frame: it can neither renew nor release the new claim
+    assert not queue.renew("desk", first)
+    queue.release("desk", first)
+    assert queue.owns("desk", second)
+    assert queue.claim("desk") is None
+
+    assert queue.renew("desk", second)
+    queue.release("desk", second)
+    assert not os.path.exists(os.path.join(queue.claims_dir, "desk"))
+
+
+def test_results_log_rotates(tmp_path):
+    queue = IngestQueue(str(tmp_path), results_max_bytes=1000)
+    for i in range(100):
+        queue.write_result("desk", {"status": "success", "message": f"frame {i}"})
+    log_path = os.path.join(queue.results_dir, "desk.jsonl")
+    assert os.path.getsize(log_path) <= 1000
+    assert os.path.getsize(log_path + ".1") <= 1100
+    assert queue.latest_result("desk")["message"] == "frame 99"
+    with open(log_path) as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if lines:
+        assert lines[-1]["message"] == "frame 99"
@@ -0,0 +1,135 @@
+"""Timing and recovery tests for Monitor thread control"""
+import threading
+import time
+import pytest
+from app.watcher.monitor import Monitor
+# Imported up front so the first tick doesn't pay for it
+import app.api.endpoints.alerts  # noqa: F401
+
+# Maximum time stop/resume/set_interval may take to reach the loop
+BUDGET = 0.1
+
+
+class SimulatedModel:
+    """Stand-in for process_screenshot that records tick times"""
+
+    def __init__(self, latency=0.0, fail=0):
+        self.latency = latency
+        self.fail = fail  # Number of ticks that raise before the model starts answering
+        self.ticks = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, screenshot_path):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.ticks.append(time.monotonic())
+            failing = len(self.ticks) <= self.fail
+        try:
+            time.sleep(self.latency)
+            if failing:
+                raise RuntimeError("simulated failure")
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        # Not a success result, so no alert is created
+        return {"status": "error", "alert_level": "ERROR", "message": "simulated"}
+
+
+def loop_threads():
+    return sum(1 for t in threading.enumerate() if t.name == "monitor-loop" and t.is_alive())
+
+
+def wait_for(predicate, timeout=5.0):
+    """Return True once predicate() holds, False on timeout"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.001)
+    return False
+
+
+@pytest.fixture
+def new_monitor(tmp_path):
+    monitors = []
+
+    def make(interval, **model_args):
+        model = SimulatedModel(**model_args)
+        monitor = Monitor(interval=interval, save_directory=str(tmp_path), capture_backend="synthetic",
+                          process_fn=model)
+        monitors.append(monitor)
+        return monitor, model
+
+    yield make
+    for monitor in monitors:
+        monitor.stop()
+    assert wait_for(lambda: loop_threads() == 0, timeout=2.0)
+
+
+def test_stop_during_interval_wait(new_monitor):
+    monitor, model = new_monitor(interval=60)
+    monitor.start()
+    assert wait_for(lambda: model.ticks and not model.in_flight)
+    time.sleep(0.05)  # Let the loop settle into the interval wait
+    start = time.monotonic()
+    monitor.stop()
+    assert wait_for(lambda: loop_threads() == 0)
+    assert time.monotonic() - start <= BUDGET
+
+
+def test_set_interval_shortens_current_wait(new_monitor):
+    monitor, model = new_monitor(interval=60)
+    monitor.start()
+    assert wait_for(lambda: model.ticks)
+    started = monitor._tick_started
+    changed = time.monotonic()
+    monitor.set_interval(0.05)
+    assert wait_for(lambda: len(model.ticks) >= 2)
+    # The second tick is due 0.05s after the first one started, or right away if that has already passed
+    due = max(changed, started + 0.05)
+    assert 0 <= model.ticks[1] - due <= BUDGET
+
+
+def test_pause_and_resume(new_monitor):
+    monitor, model = new_monitor(interval=60)
+    monitor.start()
+    assert wait_for(lambda: model.ticks)
+    monitor.pause()
+    count = len(model.ticks)
+    time.sleep(0.2)
+    assert len(model.ticks) == count
+    resumed = time.monotonic()
+    monitor.resume()
+    assert wait_for(lambda: len(model.ticks) > count)
+    assert model.ticks[-1] - resumed <= BUDGET
+
+
+def test_fast_restart_runs_a_single_loop(new_monitor):
+    monitor, model = new_monitor(interval=0.01, latency=0.5)
+    monitor.start()
+    assert wait_for(lambda: model.in_flight)
+    monitor.stop()
+    monitor.start()
+    time.sleep(1.2)
+    assert loop_threads() == 1
+    assert model.max_in_flight == 1
+
+
+def test_failed_tick_keeps_monitoring(new_monitor):
+    monitor, model = new_monitor(interval=0.01, fail=1)
+    monitor.start()
+    assert wait_for(lambda: len(model.ticks) >= 3)
+    assert monitor.monitor_thread is not None and monitor.monitor_thread.is_alive()
+
+
+def test_restart_after_failed_tick(new_monitor):
+    monitor, model = new_monitor(interval=60, fail=1)
+    monitor.start()
+    assert wait_for(lambda: model.ticks and not model.in_flight)
+    monitor.stop()
+    monitor.start()
+    assert wait_for(lambda: len(model.ticks) >= 2)
+    assert loop_threads() == 1